@@ -1,7 +1,16 @@
 # app.py
 # Simple MIDI inspector web UI (Flask)
-from flask import Flask, request, render_template_string
-import io, html
+from flask import Flask, request, jsonify
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+import hashlib, io, html, json, math, mmap, struct, time
+import numpy as np
+import metrics
+from result_cache import ResultCache
+from static_assets import StaticAssets
 
 app = Flask(__name__, static_folder=None)
 
@@ -13,8 +22,8 @@ def read_vlq(b, i):
         if not (c & 0x80): break
     return v, i
 
-def u16(b, i): return (b[i] << 8) | b[i+1]
-def u32(b, i): return (b[i] << 24) | (b[i+1] << 16) | (b[i+2] << 8) | b[i+3]
+_MTHD = struct.Struct(">4sIHHH")
+_CHUNK = struct.Struct(">4sI")
 
 NOTE_NAMES = ['C','C#','D','D#','E','F','F#','G','G#','A','A#','B']
 def note_name(n): return f"{NOTE_NAMES[n%12]}{(n//12)-1}"
@@ -25,135 +34,776 @@ def key_name(sf, mi):
     base = names[idx] if 0 <= idx < len(names) else f"sf({sf})"
     return f"{base} {'minor' if mi else 'major'}"
 
-def inspect_midi_bytes(b: bytes) -> str:
-    out = []
-    i = 0
-    if b[i:i+4] != b'MThd': raise RuntimeError("Not a MIDI file (missing MThd)")
-    i += 4
-    hdr_len = u32(b, i); i += 4
+MAX_MIDI_BYTES = 256 * 1024 * 1024   # largest SMF the inspector will accept
+STREAM_WINDOW = 64 * 1024            # bytes of a track held in memory while streaming
+_MARGIN = 16                         # room for one event header past the scan stop
+PARALLEL_MIN_TRACK_BYTES = 1 << 20   # tracks at least this big are worth a worker process
+CHECKPOINT_BYTES = 64 * 1024         # spacing of resumable decode points within a track
+SCALAR_FOLD_EVENTS = 512             # event batches shorter than this are folded per event
+
+def _parse_header(b):
+    if b[0:4] != b'MThd': raise RuntimeError("Not a MIDI file (missing MThd)")
+    _, hdr_len, fmt, ntrks, div = _MTHD.unpack_from(b, 0)
     if hdr_len != 6: raise RuntimeError(f"Unexpected header length {hdr_len}")
-    fmt = u16(b, i); i += 2
-    ntrks = u16(b, i); i += 2
-    div = u16(b, i); i += 2
-    out.append("Header:")
-    out.append(f"- Format: {fmt}")
-    out.append(f"- Tracks: {ntrks}")
+    return fmt, ntrks, div
+
+def _header_summary(fmt, ntrks, div):
+    hdr = {"format": fmt, "tracks": ntrks, "division": div}
     if div & 0x8000:
-        fps = 256 - (div >> 8); tpf = div & 0xFF
-        out.append(f"- SMPTE: {fps} fps, ticks/frame {tpf}")
-        ppq = None
+        hdr["smpte"] = {"fps": 256 - (div >> 8), "ticks_per_frame": div & 0xFF}
     else:
-        out.append(f"- PPQ: {div}")
-        ppq = div
+        hdr["ppq"] = div
+    return hdr
 
-    for t in range(ntrks):
-        if b[i:i+4] != b'MTrk': raise RuntimeError("Missing MTrk")
-        i += 4
-        length = u32(b, i); i += 4
-        end = i + length
-        out.append(f"")
-        out.append(f"Track {t+1} (len {length} bytes):")
-
-        running = None
-        abs_ticks = 0
-        name = None
-        tempos = []
-        meters = []
-        keys = []
-        texts = []
-        markers = []
-        prog = {}
-        vol = {}
-        pan = {}
-        note_on_cnt = [0]*16
-        note_off_cnt = [0]*16
-        pitch_min = [128]*16
-        pitch_max = [-1]*16
-        vel_min = [128]*16
-        vel_max = [-1]*16
-
-        while i < end:
-            dv, i = read_vlq(b, i); abs_ticks += dv
-            status = b[i]; data1 = None
-            if status < 0x80:
+def _header_report(hdr, out):
+    out.append("Header:")
+    out.append(f"- Format: {hdr['format']}")
+    out.append(f"- Tracks: {hdr['tracks']}")
+    if "smpte" in hdr:
+        out.append(f"- SMPTE: {hdr['smpte']['fps']} fps, ticks/frame {hdr['smpte']['ticks_per_frame']}")
+    else:
+        out.append(f"- PPQ: {hdr['ppq']}")
+
+# One row per channel event; status is the message type (0x80..0xE0) and
+# data2 is 0 for program change / channel pressure.
+EVENT_DTYPE = np.dtype([("abs_tick", "<i8"), ("status", "u1"), ("channel", "u1"),
+                        ("data1", "u1"), ("data2", "u1")])
+
+DUR_BINS = 32   # note duration histogram: bin b counts durations in [2**(b-1), 2**b) ticks
+
+# meta events whose payload _scan_track reads; sysex and other metas are skipped
+_DECODED_META = (0x51, 0x58, 0x59, 0x03, 0x01, 0x06)
+
+def _new_track_state():
+    return {
+        "running": None, "ticks": 0, "name": None,
+        # (offset in track body, abs tick, running status) at event starts;
+        # `base` is the index in the scanned buffer where the body starts
+        "checkpoints": [], "base": 0, "next_cp": 0,
+        "tempos": [], "meters": [], "keys": [], "texts": [], "markers": [],
+        # streaming only: bytes of an unread sysex/meta payload past the end of
+        # the buffer still to skip (None: every payload must lie inside `b`)
+        "skip": None,
+        # channel events decoded but not yet folded into the stats below
+        "col_tick": array("q"), "col_ev": bytearray(),
+        "prog": {}, "vol": {}, "pan": {}, "events": 0,
+        "note_on": np.zeros(16, np.int64), "note_off": np.zeros(16, np.int64),
+        "pitch_min": np.full(16, 128), "pitch_max": np.full(16, -1),
+        "vel_min": np.full(16, 128), "vel_max": np.full(16, -1),
+        # note tracker: start tick of the sounding note per channel*128+pitch (-1 = silent)
+        "on_tick": np.full(16 * 128, -1, np.int64),
+        "poly": np.zeros(16, np.int64), "poly_max": np.zeros(16, np.int64),
+        "poly_last": np.zeros(16, np.int64),   # tick of the last polyphony change
+        "poly_area": np.zeros(16), "poly_ticks": np.zeros(16),
+        "dur_hist": np.zeros((16, DUR_BINS), np.int64), "dur_sum": np.zeros(16),
+        "unmatched_off": np.zeros(16, np.int64),
+    }
+
+def _scan_track(b, i, stop, st):
+    # Decode the events that start before `stop`. A meta/sysex event whose
+    # payload is not fully inside `b` is left undecoded so a streaming caller
+    # can read more and resume; the index of the first undecoded byte is returned.
+    # When streaming, a payload that is never read is instead consumed up to the
+    # end of `b` and the rest is left in st["skip"] for the caller to read past.
+    # Hot path: VLQs are decoded inline, payloads are only read through a
+    # memoryview, and channel events are appended to the column buffers as
+    # (tick, status, data1, data2) for _fold_channel_stats to reduce.
+    running = st["running"]; abs_ticks = st["ticks"]
+    tempos = st["tempos"]; meters = st["meters"]; keys = st["keys"]
+    texts = st["texts"]; markers = st["markers"]
+    tick_append = st["col_tick"].append; ev_append = st["col_ev"].append
+    checkpoints = st["checkpoints"]; base = st["base"]; cp_at = st["next_cp"] + base
+    avail = len(b)
+    mv = memoryview(b)
+
+    try:
+        while i < stop:
+            ev = i
+            if i >= cp_at:
+                checkpoints.append((i - base, abs_ticks, running)); cp_at = i + CHECKPOINT_BYTES
+            c = b[i]; i += 1
+            dv = c
+            if c & 0x80:
+                dv &= 0x7F
+                while c & 0x80:
+                    c = b[i]; i += 1
+                    dv = (dv << 7) | (c & 0x7F)
+            abs_ticks += dv
+
+            s = b[i]; i += 1
+            if s < 0x80:
                 if running is None: raise RuntimeError("Running status without prior status")
-                data1 = status; status = running
+                status = running; data1 = s
+            elif s < 0xF0:
+                status = running = s
+                data1 = b[i] & 0x7F; i += 1   # stray high bits would index past the 16x128 grids
             else:
-                i += 1; running = status if status < 0xF0 else None
-
-            if status == 0xFF:
-                mtype = b[i]; i += 1
-                mlen, i = read_vlq(b, i)
-                data = b[i:i+mlen]; i += mlen
-                if mtype == 0x51 and len(data) == 3:
-                    mpqn = (data[0]<<16)|(data[1]<<8)|data[2]
-                    bpm = 60000000 / mpqn
-                    tempos.append((abs_ticks, bpm))
-                elif mtype == 0x58 and len(data) >= 2:
-                    numer, denom_pow = data[0], data[1]
-                    meters.append((abs_ticks, numer, 1<<denom_pow))
-                elif mtype == 0x59 and len(data) >= 2:
-                    sf = int.from_bytes(bytes([data[0]]), 'big', signed=True)
-                    mi = data[1]; keys.append((abs_ticks, sf, mi))
-                elif mtype == 0x03: name = data.decode('utf8', 'replace')
-                elif mtype == 0x01: texts.append((abs_ticks, data.decode('utf8','replace')))
-                elif mtype == 0x06: markers.append((abs_ticks, data.decode('utf8','replace')))
-                elif mtype == 0x2F: pass
-            elif status in (0xF0, 0xF7):
-                slen, j = read_vlq(b, i); i = j + slen
+                if s == 0xFF:
+                    mtype = b[i]
+                    mlen, j = read_vlq(b, i + 1)
+                elif s == 0xF0 or s == 0xF7:
+                    mtype = None
+                    mlen, j = read_vlq(b, i)
+                else:
+                    # not valid in an SMF; stepped over as a two-byte message
+                    running = None; i += 2
+                    continue
+                if j + mlen > avail:
+                    if st["skip"] is not None and mtype not in _DECODED_META:
+                        # streaming and the payload is never read: step past it
+                        # instead of buffering it whole
+                        running = None; st["skip"] = j + mlen - avail; i = avail
+                        break
+                    i = ev; abs_ticks -= dv
+                    break
+                running = None
+                i = j + mlen
+                if mtype is None: continue
+                if mtype == 0x51:
+                    if mlen == 3: tempos.append((abs_ticks, (b[j]<<16)|(b[j+1]<<8)|b[j+2]))
+                elif mtype == 0x58:
+                    if mlen >= 2: meters.append((abs_ticks, b[j], 1<<b[j+1]))
+                elif mtype == 0x59:
+                    if mlen >= 2:
+                        sf = b[j]; keys.append((abs_ticks, sf - 256 if sf > 127 else sf, b[j+1]))
+                elif mtype == 0x03: st["name"] = str(mv[j:i], 'utf8', 'replace')
+                elif mtype == 0x01: texts.append((abs_ticks, str(mv[j:i], 'utf8', 'replace')))
+                elif mtype == 0x06: markers.append((abs_ticks, str(mv[j:i], 'utf8', 'replace')))
+                continue
+
+            hi = status & 0xF0
+            if hi == 0xC0 or hi == 0xD0:
+                data2 = 0
+            else:
+                data2 = b[i] & 0x7F; i += 1
+            tick_append(abs_ticks); ev_append(status); ev_append(data1); ev_append(data2)
+    finally:
+        mv.release()
+
+    st["running"] = running; st["ticks"] = abs_ticks; st["next_cp"] = cp_at - base
+    return i
+
+def _event_table(st):
+    ticks, ev = st["col_tick"], st["col_ev"]
+    n = len(ticks)
+    table = np.empty(n, EVENT_DTYPE)
+    if n:
+        raw = np.frombuffer(ev, np.uint8).reshape(n, 3)
+        table["abs_tick"] = np.frombuffer(ticks, np.int64)
+        table["status"] = raw[:, 0] & 0xF0
+        table["channel"] = raw[:, 0] & 0x0F
+        table["data1"] = raw[:, 1]
+        table["data2"] = raw[:, 2]
+        del raw
+    return table
+
+def _last_per_channel(table, mask, col):
+    # {channel: value of the last matching event}
+    rows = table[mask]
+    if not len(rows): return {}
+    chs = rows["channel"][::-1]
+    uniq, first = np.unique(chs, return_index=True)
+    vals = rows[col][::-1][first]
+    return dict(zip(uniq.tolist(), vals.tolist()))
+
+def _range_per_channel(ch, vals):
+    # (min, max) of 7-bit values per channel from a 16x128 occurrence grid;
+    # channels without values get (128, -1).
+    grid = np.bincount(ch.astype(np.intp) * 128 + vals, minlength=16 * 128).reshape(16, 128) > 0
+    seen = grid.any(axis=1)
+    lo = np.where(seen, grid.argmax(axis=1), 128)
+    hi = np.where(seen, 127 - grid[:, ::-1].argmax(axis=1), -1)
+    return lo, hi
+
+def channel_stats(table):
+    # Per-channel reductions over an event table (see midi_event_table).
+    status, ch = table["status"], table["channel"]
+    d1, d2 = table["data1"], table["data2"]
+    on = (status == 0x90) & (d2 > 0)
+    off = (status == 0x80) | ((status == 0x90) & (d2 == 0))
+    ch_on = ch[on]
+    pitch_min, pitch_max = _range_per_channel(ch_on, d1[on])
+    vel_min, vel_max = _range_per_channel(ch_on, d2[on])
+    cc = status == 0xB0
+    return {
+        "note_on": np.bincount(ch_on, minlength=16),
+        "note_off": np.bincount(ch[off], minlength=16),
+        "pitch_min": pitch_min, "pitch_max": pitch_max,
+        "vel_min": vel_min, "vel_max": vel_max,
+        "prog": _last_per_channel(table, status == 0xC0, "data1"),
+        "vol": _last_per_channel(table, cc & (d1 == 7), "data2"),
+        "pan": _last_per_channel(table, cc & (d1 == 10), "data2"),
+    }
+
+def _fold_notes(st, table):
+    # Pair note-ons with the next note-off (or retrigger) of the same
+    # channel/pitch. Notes still sounding are carried between batches in
+    # st["on_tick"], so memory stays bounded by the 16x128 key space.
+    status = table["status"]
+    sel = np.flatnonzero((status == 0x90) | (status == 0x80))
+    if not len(sel): return
+    ev_ch = table["channel"][sel]; ev_tick = table["abs_tick"][sel]
+    on_tick = st["on_tick"]
+    carried = np.flatnonzero(on_tick >= 0)
+    n0 = len(carried)
+    key = np.concatenate([carried.astype(np.int16), ev_ch.astype(np.int16) * 128 + table["data1"][sel]])
+    tick = np.concatenate([on_tick[carried], ev_tick])
+    is_on = np.concatenate([np.ones(n0, bool), (status[sel] == 0x90) & (table["data2"][sel] > 0)])
+    order = np.argsort(key, kind="stable")   # int16 keys: radix sort, keeps time order per key
+    key, tick, is_on = key[order], tick[order], is_on[order]
+
+    same = key[1:] == key[:-1]
+    closes = np.flatnonzero(is_on[:-1] & same)        # event i+1 ends the note started at i
+    ends = closes + 1
+    dur = tick[ends] - tick[closes]
+    dur_ch = key[closes] >> 7
+    bins = np.minimum(np.frexp(dur)[1], DUR_BINS - 1)
+    st["dur_hist"] += np.bincount(dur_ch * DUR_BINS + bins, minlength=16 * DUR_BINS).reshape(16, DUR_BINS)
+    st["dur_sum"] += np.bincount(dur_ch, weights=dur, minlength=16)
+    ended = np.zeros(len(key), bool); ended[ends] = True
+    st["unmatched_off"] += np.bincount(key[~is_on & ~ended] >> 7, minlength=16)
+    last = np.ones(len(key), bool); last[:-1] = ~same
+    sounding = last & is_on
+    on_tick[:] = -1; on_tick[key[sounding]] = tick[sounding]
+
+    # polyphony change per event (+1 note-on, -1 note end, 0 for a retrigger),
+    # back in time order; carried notes are already counted in st["poly"]
+    delta = is_on.astype(np.int8); delta[ends] -= 1
+    d = np.empty_like(delta); d[order] = delta
+    d = d[n0:]
+    nz = np.flatnonzero(d)
+    if not len(nz): return
+    by_ch = nz[np.argsort(ev_ch[nz], kind="stable")]
+    d, d_ch, d_tick = d[by_ch].astype(np.int64), ev_ch[by_ch].astype(np.intp), ev_tick[by_ch]
+    firsts = np.flatnonzero(np.r_[True, d_ch[1:] != d_ch[:-1]])
+    lasts = np.r_[firsts[1:] - 1, len(d_ch) - 1]
+    csum = np.cumsum(d)
+    offset = np.repeat(csum[firsts] - d[firsts], np.diff(np.r_[firsts, len(d_ch)]))
+    level = st["poly"][d_ch] + csum - offset          # polyphony after each change
+    before = level - d
+    prev = np.empty_like(d_tick); prev[1:] = d_tick[:-1]
+    prev[firsts] = st["poly_last"][d_ch[firsts]]
+    span = d_tick - prev
+    st["poly_area"] += np.bincount(d_ch, weights=before * span, minlength=16)
+    st["poly_ticks"] += np.bincount(d_ch, weights=(before > 0) * span, minlength=16)
+    # events sharing a tick are simultaneous: only the level after the last one counts
+    tick_end = np.r_[(d_ch[1:] != d_ch[:-1]) | (d_tick[1:] != d_tick[:-1]), True]
+    chs = d_ch[firsts]
+    peak = np.maximum.reduceat(np.where(tick_end, level, 0), firsts)
+    st["poly_max"][chs] = np.maximum(st["poly_max"][chs], peak)
+    st["poly"][chs] = level[lasts]
+    st["poly_last"][chs] = d_tick[lasts]
+
+def _fold_scalar(st):
+    # Per-event channel_stats + _fold_notes with the same results, for batches
+    # too short to pay for their fixed per-call NumPy cost (small tracks, the
+    # tail of a stream).
+    ticks, ev = st["col_tick"], st["col_ev"]
+    on_tick = st["on_tick"]
+    prog, vol, pan = st["prog"], st["vol"], st["pan"]
+    note_on, note_off = st["note_on"].tolist(), st["note_off"].tolist()
+    pitch_min, pitch_max = st["pitch_min"].tolist(), st["pitch_max"].tolist()
+    vel_min, vel_max = st["vel_min"].tolist(), st["vel_max"].tolist()
+    unmatched, dur_sum = st["unmatched_off"].tolist(), st["dur_sum"].tolist()
+    poly, poly_last, poly_max = st["poly"].tolist(), st["poly_last"].tolist(), st["poly_max"].tolist()
+    poly_area, poly_ticks = st["poly_area"].tolist(), st["poly_ticks"].tolist()
+    hist = [0] * (16 * DUR_BINS)
+    peak = [None] * 16   # level after the latest change, counted once its tick is over
+    sounding = {}        # channel*128+pitch -> start tick (-1 = silent) for keys seen in this batch
+    for tick, status, d1, d2 in zip(ticks, ev[0::3], ev[1::3], ev[2::3]):
+        hi = status & 0xF0; ch = status & 0x0F
+        if hi == 0x90 or hi == 0x80:
+            key = ch * 128 + d1
+            start = sounding.get(key)
+            if start is None: start = int(on_tick[key])
+            if hi == 0x90 and d2:
+                note_on[ch] += 1
+                if d1 < pitch_min[ch]: pitch_min[ch] = d1
+                if d1 > pitch_max[ch]: pitch_max[ch] = d1
+                if d2 < vel_min[ch]: vel_min[ch] = d2
+                if d2 > vel_max[ch]: vel_max[ch] = d2
+                sounding[key] = tick
+                if start >= 0:   # retrigger: the old note ends, polyphony is unchanged
+                    dur = tick - start
+                    hist[ch * DUR_BINS + min(dur.bit_length(), DUR_BINS - 1)] += 1; dur_sum[ch] += dur
+                    continue
+                delta = 1
             else:
-                hi = status & 0xF0; ch = status & 0x0F
-                if data1 is None: data1 = b[i]; i += 1
-                data2 = None if hi in (0xC0, 0xD0) else b[i]; 
-                if data2 is not None: i += 1
-                if hi == 0x90:
-                    n, v = data1, (0 if data2 is None else data2)
-                    if v == 0: note_off_cnt[ch] += 1
-                    else:
-                        note_on_cnt[ch] += 1
-                        pitch_min[ch] = min(pitch_min[ch], n)
-                        pitch_max[ch] = max(pitch_max[ch], n)
-                        vel_min[ch] = min(vel_min[ch], v)
-                        vel_max[ch] = max(vel_max[ch], v)
-                elif hi == 0x80:
-                    note_off_cnt[ch] += 1
-                elif hi == 0xB0:
-                    cc, val = data1, (0 if data2 is None else data2)
-                    if cc == 7: vol[ch] = val
-                    elif cc == 10: pan[ch] = val
-                elif hi == 0xC0:
-                    prog[ch] = data1
-
-        if name: out.append(f"  TrackName: {name}")
-        for (tick,bpm) in tempos: out.append(f"  Tempo @ {tick}: {bpm:.3f} bpm")
-        for (tick,n,d) in meters: out.append(f"  TimeSig @ {tick}: {n}/{d}")
-        for (tick,sf,mi) in keys: out.append(f"  KeySig @ {tick}: {key_name(sf,mi)} (sf={sf}, mi={mi})")
-        for (tick,txt) in texts[:20]: out.append(f"  Text @ {tick}: {txt}")
-        for (tick,mk) in markers[:50]: out.append(f"  Marker @ {tick}: {mk}")
-        for ch,p in sorted(prog.items()): out.append(f"  Channel {ch+1} Program: {p}")
-        for ch,v in sorted(vol.items()): out.append(f"  Channel {ch+1} Volume: {v}")
-        for ch,v in sorted(pan.items()): out.append(f"  Channel {ch+1} Pan: {v}")
-        for ch in range(16):
-            if note_on_cnt[ch] or note_off_cnt[ch]:
-                pr = f"{note_name(pitch_min[ch])}-{note_name(pitch_max[ch])}" if pitch_max[ch] >= 0 else "-"
-                vr = f"{vel_min[ch]}-{vel_max[ch]}" if vel_max[ch] >= 0 else "-"
-                out.append(f"  Channel {ch+1}: notes on/off {note_on_cnt[ch]}/{note_off_cnt[ch]}  pitch {pr}  vel {vr}")
+                note_off[ch] += 1
+                if start < 0:
+                    unmatched[ch] += 1; continue
+                dur = tick - start
+                hist[ch * DUR_BINS + min(dur.bit_length(), DUR_BINS - 1)] += 1; dur_sum[ch] += dur
+                sounding[key] = -1
+                delta = -1
+            before = poly[ch]; span = tick - poly_last[ch]
+            if span and peak[ch] is not None and peak[ch] > poly_max[ch]: poly_max[ch] = peak[ch]
+            poly_area[ch] += before * span
+            if before > 0: poly_ticks[ch] += span
+            poly[ch] = peak[ch] = before + delta; poly_last[ch] = tick
+        elif hi == 0xC0: prog[ch] = d1
+        elif hi == 0xB0:
+            if d1 == 7: vol[ch] = d2
+            elif d1 == 10: pan[ch] = d2
+    for ch, level in enumerate(peak):
+        if level is not None and level > poly_max[ch]: poly_max[ch] = level
+    for key, tick in sounding.items(): on_tick[key] = tick
+    st["dur_hist"] += np.array(hist).reshape(16, DUR_BINS)
+    st["note_on"][:] = note_on; st["note_off"][:] = note_off
+    st["pitch_min"][:] = pitch_min; st["pitch_max"][:] = pitch_max
+    st["vel_min"][:] = vel_min; st["vel_max"][:] = vel_max
+    st["unmatched_off"][:] = unmatched; st["dur_sum"][:] = dur_sum
+    st["poly"][:] = poly; st["poly_last"][:] = poly_last; st["poly_max"][:] = poly_max
+    st["poly_area"][:] = poly_area; st["poly_ticks"][:] = poly_ticks
+    st["events"] += len(ticks)
+    del ticks[:]; del ev[:]
+
+def _fold_channel_stats(st):
+    # Reduce the pending column buffers into the track's running stats.
+    if not st["col_tick"]: return
+    if len(st["col_tick"]) < SCALAR_FOLD_EVENTS: return _fold_scalar(st)
+    table = _event_table(st)
+    cs = channel_stats(table)
+    _fold_notes(st, table)
+    st["events"] += len(table)
+    del st["col_tick"][:]; del st["col_ev"][:]
+    st["note_on"] += cs["note_on"]; st["note_off"] += cs["note_off"]
+    np.minimum(st["pitch_min"], cs["pitch_min"], out=st["pitch_min"])
+    np.maximum(st["pitch_max"], cs["pitch_max"], out=st["pitch_max"])
+    np.minimum(st["vel_min"], cs["vel_min"], out=st["vel_min"])
+    np.maximum(st["vel_max"], cs["vel_max"], out=st["vel_max"])
+    st["prog"].update(cs["prog"]); st["vol"].update(cs["vol"]); st["pan"].update(cs["pan"])
 
+def _note_summary(st, ch, hanging, poly_area, poly_ticks):
+    hist = st["dur_hist"][ch].tolist()
+    paired = sum(hist)
+    if not paired and not hanging: return None
+    while hist and not hist[-1]: hist.pop()
+    return {
+        "paired": paired, "hanging": hanging, "unmatched_off": int(st["unmatched_off"][ch]),
+        "mean_ticks": float(st["dur_sum"][ch]) / paired if paired else None,
+        "duration_hist": hist,
+        "max_polyphony": int(st["poly_max"][ch]),
+        "avg_polyphony": poly_area / poly_ticks if poly_ticks else None,
+    }
+
+def _track_summary(t, length, st):
+    prog, vol, pan = st["prog"], st["vol"], st["pan"]
+    note_on_cnt, note_off_cnt = st["note_on"].tolist(), st["note_off"].tolist()
+    pitch_min, pitch_max = st["pitch_min"].tolist(), st["pitch_max"].tolist()
+    vel_min, vel_max = st["vel_min"].tolist(), st["vel_max"].tolist()
+    hanging = (st["on_tick"].reshape(16, 128) >= 0).sum(axis=1).tolist()
+    # notes left hanging keep sounding until the end of the track
+    tail = (st["ticks"] - st["poly_last"]) * (st["poly"] > 0)
+    poly_area = (st["poly_area"] + st["poly"] * tail).tolist()
+    poly_ticks = (st["poly_ticks"] + tail).tolist()
+    channels = []
+    for ch in range(16):
+        if ch in prog or ch in vol or ch in pan or note_on_cnt[ch] or note_off_cnt[ch]:
+            channels.append({
+                "channel": ch + 1,
+                "program": prog.get(ch), "volume": vol.get(ch), "pan": pan.get(ch),
+                "note_on": note_on_cnt[ch], "note_off": note_off_cnt[ch],
+                "pitch": [pitch_min[ch], pitch_max[ch]] if pitch_max[ch] >= 0 else None,
+                "velocity": [vel_min[ch], vel_max[ch]] if vel_max[ch] >= 0 else None,
+                "notes": _note_summary(st, ch, hanging[ch], poly_area[ch], poly_ticks[ch]),
+            })
+    return {
+        "track": t + 1, "length": length, "name": st["name"],
+        "tempos": [{"tick": tick, "bpm": 60000000 / mpqn, "mpqn": mpqn} for tick, mpqn in st["tempos"]],
+        "meters": [{"tick": tick, "numerator": n, "denominator": d} for tick, n, d in st["meters"]],
+        "keys": [{"tick": tick, "sf": sf, "mi": mi, "key": key_name(sf, mi)} for tick, sf, mi in st["keys"]],
+        "texts": [{"tick": tick, "text": txt} for tick, txt in st["texts"]],
+        "markers": [{"tick": tick, "text": mk} for tick, mk in st["markers"]],
+        "channels": channels,
+        "end_tick": st["ticks"],
+        "events": st["events"],
+        "checkpoints": st["checkpoints"],
+    }
+
+def _track_report(trk, out):
+    out.append(f"")
+    out.append(f"Track {trk['track']} (len {trk['length']} bytes):")
+    channels = trk["channels"]
+    if trk["name"]: out.append(f"  TrackName: {trk['name']}")
+    for e in trk["tempos"]: out.append(f"  Tempo @ {e['tick']}: {e['bpm']:.3f} bpm")
+    for e in trk["meters"]: out.append(f"  TimeSig @ {e['tick']}: {e['numerator']}/{e['denominator']}")
+    for e in trk["keys"]: out.append(f"  KeySig @ {e['tick']}: {e['key']} (sf={e['sf']}, mi={e['mi']})")
+    for e in trk["texts"][:20]: out.append(f"  Text @ {e['tick']}: {e['text']}")
+    for e in trk["markers"][:50]: out.append(f"  Marker @ {e['tick']}: {e['text']}")
+    for c in channels:
+        if c["program"] is not None: out.append(f"  Channel {c['channel']} Program: {c['program']}")
+    for c in channels:
+        if c["volume"] is not None: out.append(f"  Channel {c['channel']} Volume: {c['volume']}")
+    for c in channels:
+        if c["pan"] is not None: out.append(f"  Channel {c['channel']} Pan: {c['pan']}")
+    for c in channels:
+        if c["note_on"] or c["note_off"]:
+            pr = f"{note_name(c['pitch'][0])}-{note_name(c['pitch'][1])}" if c["pitch"] else "-"
+            vr = f"{c['velocity'][0]}-{c['velocity'][1]}" if c["velocity"] else "-"
+            out.append(f"  Channel {c['channel']}: notes on/off {c['note_on']}/{c['note_off']}  pitch {pr}  vel {vr}")
+    for c in channels:
+        n = c["notes"]
+        if not n: continue
+        avg = f"{n['avg_polyphony']:.2f}" if n["avg_polyphony"] is not None else "-"
+        dur = f"{n['mean_ticks']:.1f}" if n["mean_ticks"] is not None else "-"
+        out.append(f"  Channel {c['channel']} Notes: {n['paired']} paired, {n['hanging']} hanging, "
+                   f"{n['unmatched_off']} unmatched off  polyphony max {n['max_polyphony']} avg {avg}  "
+                   f"mean duration {dur} ticks")
+        hist = " ".join(f"{'0' if b == 0 else f'<{1 << b}'}:{k}" for b, k in enumerate(n["duration_hist"]) if k)
+        if hist: out.append(f"  Channel {c['channel']} Durations (ticks): {hist}")
+
+def format_report(result):
+    out = []
+    _header_report(result["header"], out)
+    for trk in result["tracks"]: _track_report(trk, out)
     return "\n".join(out)
 
+def _track_spans(b, ntrks):
+    i = 14
+    for t in range(ntrks):
+        if b[i:i+4] != b'MTrk': raise RuntimeError("Missing MTrk")
+        _, length = _CHUNK.unpack_from(b, i); i += 8
+        if i + length > len(b): raise RuntimeError(f"Truncated MIDI data (track {t+1})")
+        yield t, i, length
+        i += length
+
+def _peek_track_name(b, i, end):
+    # TrackName from the leading meta/sysex events, without decoding the body
+    for _ in range(32):
+        if i >= end: break
+        _, i = read_vlq(b, i)
+        s = b[i]
+        if s == 0xFF:
+            mlen, j = read_vlq(b, i + 2)
+            if b[i+1] == 0x03: return str(b[j:j+mlen], 'utf8', 'replace')
+            i = j + mlen
+        elif s == 0xF0 or s == 0xF7:
+            mlen, j = read_vlq(b, i + 1); i = j + mlen
+        else:
+            break
+    return None
+
+def _decode_track(b, t, i, length):
+    st = _new_track_state()
+    st["base"] = i
+    if _scan_track(b, i, i + length, st) < i + length:
+        raise RuntimeError(f"Truncated event in track {t+1}")
+    return st
+
+def index_tracks(b):
+    # Header plus offset/length/name of every MTrk chunk. Bodies are skipped
+    # using the chunk length, so this costs O(tracks) rather than O(bytes).
+    fmt, ntrks, div = _parse_header(b)
+    tracks = [{"track": t + 1, "offset": i, "length": length, "name": _peek_track_name(b, i, i + length)}
+              for t, i, length in _track_spans(b, ntrks)]
+    return {"header": _header_summary(fmt, ntrks, div), "tracks": tracks}
+
+def scan_track(b, entry):
+    # Decode the one track described by an index_tracks() entry.
+    t = entry["track"] - 1
+    st = _decode_track(b, t, entry["offset"], entry["length"])
+    _fold_channel_stats(st)
+    return _track_summary(t, entry["length"], st)
+
+def midi_event_table(b):
+    # Columnar channel events (EVENT_DTYPE), one structured array per track.
+    fmt, ntrks, div = _parse_header(b)
+    return [_event_table(_decode_track(b, t, i, length)) for t, i, length in _track_spans(b, ntrks)]
+
+def _scan_shared_track(shm_name, entry):
+    # Worker side: copy one track out of the parent's shared memory and decode it.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[entry["offset"]:entry["offset"] + entry["length"]]
+        body = bytes(view); view.release()
+    finally:
+        shm.close()
+    return scan_track(body, dict(entry, offset=0))
+
+def _scan_shared_upload(shm_name, size):
+    # Worker side: scan a whole upload in place in the parent's shared memory.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf[:size]
+    try:
+        return scan_midi(view)
+    finally:
+        view.release(); shm.close()
+
+def _scan_upload_in(executor, stream):
+    # The spooled upload is copied into shared memory a window at a time, so
+    # neither side holds (or pickles) the file as one bytes object.
+    size = stream.seek(0, io.SEEK_END); stream.seek(0)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        pos = 0
+        for chunk in iter(lambda: stream.read(STREAM_WINDOW), b""):
+            shm.buf[pos:pos + len(chunk)] = chunk; pos += len(chunk)
+        return executor.submit(_scan_shared_upload, shm.name, pos).result()
+    finally:
+        shm.close(); shm.unlink()
+
+_pool = None
+
+def _get_pool(workers):
+    global _pool
+    if _pool is None or _pool._max_workers != workers:
+        if _pool is not None: _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+def _scan_tracks_parallel(b, entries, workers):
+    # Large tracks go to the pool, which reads the file from one shared-memory
+    # copy; small ones are decoded here meanwhile. Results keep track order.
+    shm = shared_memory.SharedMemory(create=True, size=len(b))
+    try:
+        shm.buf[:len(b)] = b
+        pool = _get_pool(workers)
+        futures = {e["track"]: pool.submit(_scan_shared_track, shm.name, e)
+                   for e in entries if e["length"] >= PARALLEL_MIN_TRACK_BYTES}
+        local = {e["track"]: scan_track(b, e) for e in entries if e["track"] not in futures}
+        return [futures[e["track"]].result() if e["track"] in futures else local[e["track"]] for e in entries]
+    finally:
+        shm.close(); shm.unlink()
+
+def scan_midi(b, workers=None):
+    # workers > 1 decodes the large tracks of a format-1 file in parallel;
+    # files with fewer than two such tracks stay on the serial path.
+    index = index_tracks(b)
+    entries = index["tracks"]
+    big = sum(1 for e in entries if e["length"] >= PARALLEL_MIN_TRACK_BYTES)
+    if workers and workers > 1 and index["header"]["format"] == 1 and big >= 2:
+        tracks = _scan_tracks_parallel(b, entries, workers)
+    else:
+        tracks = [scan_track(b, entry) for entry in entries]
+    return {"header": index["header"], "tracks": tracks}
+
+# scan metrics; events are channel events
+SCAN_BYTES = metrics.histogram("midi_inspect_bytes", "Size of scanned MIDI files.", metrics.exponential(1024, 4, 10))
+SCAN_TRACKS = metrics.histogram("midi_inspect_tracks", "Tracks per scanned MIDI file.", metrics.exponential(1, 2, 10))
+SCAN_EVENTS = metrics.histogram("midi_inspect_events", "Channel events per scanned MIDI file.",
+                                metrics.exponential(100, 4, 10))
+SCAN_SECONDS = metrics.histogram("midi_inspect_seconds", "Wall time to scan a MIDI file.",
+                                 metrics.exponential(0.0005, 2, 16))
+SCAN_US_PER_EVENT = metrics.histogram("midi_inspect_us_per_event", "Scan time per channel event (microseconds).",
+                                      metrics.exponential(0.125, 2, 12))
+
+def _record_scan(result, nbytes, seconds):
+    events = sum(t["events"] for t in result["tracks"])
+    SCAN_BYTES.observe(nbytes); SCAN_TRACKS.observe(result["header"]["tracks"])
+    SCAN_EVENTS.observe(events); SCAN_SECONDS.observe(seconds)
+    if events: SCAN_US_PER_EVENT.observe(seconds * 1e6 / events)
+
+def inspect_midi_bytes(b: bytes) -> str:
+    t0 = time.perf_counter()
+    result = scan_midi(b)
+    _record_scan(result, len(b), time.perf_counter() - t0)
+    return format_report(result)
+
+class TempoMap:
+    # Tick <-> seconds for one file. Cumulative microseconds are kept at
+    # every tempo change so both directions are a bisect plus one multiply.
+    def __init__(self, division, tempos=()):
+        # tempos: (tick, microseconds per quarter note) in tick order; ignored for SMPTE
+        if division & 0x8000:
+            fps = 256 - (division >> 8)
+            fps = 29.97 if fps == 29 else fps   # -29 is 30 fps drop-frame
+            self.ticks, self.us, self.rate = [0], [0.0], [1e6 / (fps * (division & 0xFF))]
+            return
+        ticks, us, rate = [0], [0.0], [500000 / division]
+        for tick, mpqn in tempos:
+            if tick > ticks[-1]:
+                us.append(us[-1] + (tick - ticks[-1]) * rate[-1]); ticks.append(tick); rate.append(0)
+            rate[-1] = mpqn / division
+        self.ticks, self.us, self.rate = ticks, us, rate
+
+    def tick_to_seconds(self, tick):
+        k = bisect_right(self.ticks, tick) - 1
+        return (self.us[k] + (tick - self.ticks[k]) * self.rate[k]) / 1e6
+
+    def seconds_to_tick(self, sec):
+        us = max(sec, 0) * 1e6
+        k = bisect_right(self.us, us) - 1
+        return self.ticks[k] + (us - self.us[k]) / self.rate[k]
+
+EVENT_TYPES = {0x80: "note_off", 0x90: "note_on", 0xA0: "poly_aftertouch", 0xB0: "control_change",
+               0xC0: "program_change", 0xD0: "channel_pressure", 0xE0: "pitch_bend"}
+
+def _iter_events(b, i, end, abs_ticks, running):
+    # (tick, event) from a checkpoint, where `i` is an event start in `b`
+    while i < end:
+        dv, i = read_vlq(b, i); abs_ticks += dv
+        s = b[i]; i += 1
+        if s >= 0xF0:
+            running = None
+            if s == 0xFF:
+                mtype = b[i]
+                mlen, j = read_vlq(b, i + 1); i = j + mlen
+                payload = bytes(b[j:i])
+                ev = {"type": "meta", "meta": mtype}
+                if 0x01 <= mtype <= 0x07: ev["text"] = payload.decode('utf8', 'replace')
+                else: ev["data"] = payload.hex()
+            elif s == 0xF0 or s == 0xF7:
+                mlen, j = read_vlq(b, i); i = j + mlen
+                ev = {"type": "sysex", "length": mlen}
+            else:
+                i += 2
+                continue
+            yield abs_ticks, ev
+            continue
+        if s < 0x80:
+            if running is None: raise RuntimeError("Running status without prior status")
+            status, data1 = running, s
+        else:
+            status = running = s
+            data1 = b[i] & 0x7F; i += 1
+        hi = status & 0xF0
+        ev = {"type": EVENT_TYPES[hi], "channel": (status & 0x0F) + 1, "data1": data1}
+        if hi != 0xC0 and hi != 0xD0:
+            ev["data2"] = b[i] & 0x7F; i += 1
+        yield abs_ticks, ev
+
+def _tick_bound(tick):
+    # first whole tick at or after a converted time; the slack absorbs float
+    # error so an event exactly at the boundary time maps back to its own tick
+    return math.ceil(tick - 1e-9 * max(1.0, tick))
+
+def track_timeline(b, entry):
+    # The tempos and checkpoints of one track, which is all query_time_range
+    # needs: the decode loop alone, with the channel columns dropped a
+    # checkpoint span at a time instead of folded into stats.
+    t = entry["track"] - 1
+    st = _new_track_state()
+    i = st["base"] = entry["offset"]; end = i + entry["length"]
+    while i < end:
+        stop = min(i + CHECKPOINT_BYTES, end)
+        i = _scan_track(b, i, stop, st)
+        if i < stop: raise RuntimeError(f"Truncated event in track {t+1}")
+        del st["col_tick"][:]; del st["col_ev"][:]
+    return {"tempos": [{"tick": tick, "mpqn": mpqn} for tick, mpqn in st["tempos"]],
+            "checkpoints": st["checkpoints"]}
+
+def query_time_range(b, start, end, tracks=None, summary=None, limit=10000):
+    # Events whose wall-clock time falls in [start, end) seconds (end None:
+    # to the end of the track). Decoding resumes at the last checkpoint before
+    # the range instead of at the start of each track; `summary(entry)` supplies
+    # the tempos and checkpoints (track_timeline, or cached scan_track results).
+    summary = summary or (lambda entry: track_timeline(b, entry))
+    index = index_tracks(b)
+    hdr, entries = index["header"], index["tracks"]
+    timelines = {}
+    def timeline(entry):
+        if entry["track"] not in timelines: timelines[entry["track"]] = summary(entry)
+        return timelines[entry["track"]]
+    out = []
+    for n in tracks or [e["track"] for e in entries]:
+        entry = entries[n - 1]
+        # format 0/1 keep the tempo map in the first track; format 2 tracks carry their own
+        tempo_src = timeline(entries[0] if hdr["format"] != 2 else entry)
+        tmap = TempoMap(hdr["division"], [(e["tick"], e["mpqn"]) for e in tempo_src["tempos"]])
+        lo = _tick_bound(tmap.seconds_to_tick(start))
+        hi = None if end is None else _tick_bound(tmap.seconds_to_tick(end))
+        cps = timeline(entry)["checkpoints"]
+        k = bisect_right([cp[1] for cp in cps], lo) - 1
+        while k >= 0 and cps[k][1] >= lo: k -= 1    # earlier events may share the checkpoint tick
+        offset, tick, running = cps[k] if k >= 0 else (0, 0, None)
+        events = []; truncated = False
+        body = entry["offset"]
+        for tick, ev in _iter_events(b, body + offset, body + entry["length"], tick, running):
+            if hi is not None and tick >= hi: break
+            if tick < lo: continue
+            if len(events) == limit:
+                truncated = True; break
+            ev["tick"] = tick; ev["time"] = tmap.tick_to_seconds(tick)
+            events.append(ev)
+        out.append({"track": n, "tick_range": [lo, hi], "events": events, "truncated": truncated})
+    return {"header": hdr, "start": start, "end": end, "tracks": out}
+
+def _read_exact(fp, n, what):
+    data = fp.read(n)
+    if len(data) != n: raise RuntimeError(f"Truncated MIDI data ({what})")
+    return data
+
+def _skip_exact(fp, n, window, t):
+    # read past n bytes a window at a time; a short read is a truncated track
+    while n:
+        got = len(fp.read(min(n, window)))
+        if not got: raise RuntimeError(f"Truncated MIDI data (track {t+1})")
+        n -= got
+
+def scan_midi_stream(fp, window=STREAM_WINDOW, max_bytes=MAX_MIDI_BYTES):
+    # Same result as scan_midi, read from a file object with at most about
+    # `window` bytes of one track buffered at a time. Chunk lengths are
+    # checked against `max_bytes` before any track body is read.
+    window = max(window, 4 * _MARGIN)
+    fmt, ntrks, div = _parse_header(_read_exact(fp, 14, "header"))
+    tracks = []
+    total = 14
+
+    for t in range(ntrks):
+        chunk = fp.read(8)
+        if chunk[:4] != b'MTrk': raise RuntimeError("Missing MTrk")
+        if len(chunk) != 8: raise RuntimeError(f"Truncated MIDI data (track {t+1} header)")
+        _, length = _CHUNK.unpack(chunk)
+        total += 8 + length
+        if total > max_bytes: raise RuntimeError(f"MIDI data exceeds {max_bytes} bytes")
+
+        st = _new_track_state()
+        st["skip"] = 0
+        buf = bytearray(); pos = 0; left = length; grow = False
+        try:
+            while True:
+                if left and (grow or len(buf) - pos < window):
+                    del buf[:pos]; st["base"] -= pos; pos = 0
+                    more = fp.read(min(left, window))
+                    if not more: raise RuntimeError(f"Truncated MIDI data (track {t+1})")
+                    buf += more; left -= len(more); grow = False
+                    continue
+                if pos >= len(buf): break
+                stop = len(buf) - _MARGIN if left else len(buf)
+                j = _scan_track(buf, pos, stop, st)
+                _fold_channel_stats(st)
+                if st["skip"]:
+                    if st["skip"] > left: raise RuntimeError(f"Truncated MIDI data (track {t+1})")
+                    _skip_exact(fp, st["skip"], window, t)
+                    left -= st["skip"]; st["base"] -= st["skip"]; st["skip"] = 0
+                # nothing decoded: the next event is larger than the window
+                grow = j == pos
+                if grow and not left: raise RuntimeError(f"Truncated event in track {t+1}")
+                pos = j
+        except IndexError:
+            raise RuntimeError(f"Truncated MIDI data (track {t+1})") from None
+        tracks.append(_track_summary(t, length, st))
+
+    return {"header": _header_summary(fmt, ntrks, div), "tracks": tracks}
+
+def inspect_midi_stream(fp, window=STREAM_WINDOW, max_bytes=MAX_MIDI_BYTES) -> str:
+    return format_report(scan_midi_stream(fp, window, max_bytes))
+
+def _map_upload(f):
+    # mmap uploads werkzeug has spooled to disk instead of copying them into memory
+    stream = f.stream
+    stream.seek(0, io.SEEK_END); size = stream.tell(); stream.seek(0)
+    if size > STREAM_WINDOW:
+        try:
+            return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+    return stream.read()
+
+def _upload_digest(stream):
+    # content address of an upload, hashed a window at a time
+    h = hashlib.blake2b(digest_size=20)
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(STREAM_WINDOW), b""): h.update(chunk)
+    stream.seek(0)
+    return h.hexdigest()
+
 PAGE = """
 <!doctype html>
 <title>MIDI Inspector</title>
 <meta name="viewport" content="width=device-width, initial-scale=1">
-<style>
- body{font-family:system-ui,Segoe UI,Arial;padding:24px;background:#f6f7fb;color:#111}
- .card{max-width:900px;margin:0 auto;background:#fff;border-radius:12px;box-shadow:0 8px 30px rgba(0,0,0,.06);padding:20px}
- .row{display:flex;gap:10px;flex-wrap:wrap;align-items:center}
- input[type=file]{padding:.6rem;border:1px solid #d1d5db;border-radius:10px;background:#fff}
- button{padding:.6rem 1rem;border:none;border-radius:999px;background:#2563eb;color:#fff;font-weight:700;cursor:pointer}
- pre{white-space:pre-wrap;background:#0b1020;color:#e6edf3;padding:14px;border-radius:10px;overflow:auto}
- .small{color:#6b7280;font-size:.9rem;margin-top:6px}
-</style>
+<link rel="stylesheet" href="{{ asset_url('inspect.css') }}">
 <div class="card">
   <h2>MIDI Inspector (Python Flask)</h2>
   <form class="row" method="post" enctype="multipart/form-data">
@@ -169,17 +819,144 @@ PAGE = """
 </div>
 """
 
+# page template compiled once; the plain GET page is rendered once as well
+assets = StaticAssets(app)
+metrics.instrument(app, "inspector")
+PAGE_T = app.jinja_env.from_string(PAGE)
+INDEX_HTML = PAGE_T.render(result="")
+
+# oversized uploads are refused with 413 before the body is spooled
+app.config["MAX_CONTENT_LENGTH"] = MAX_MIDI_BYTES + 64 * 1024
+# worker processes for decoding large format-1 uploads; 0 streams them serially
+app.config["INSPECT_WORKERS"] = 0
+# executor (e.g. serve.RecyclingPool) that runs the scan of / uploads off the request thread
+app.config["CPU_EXECUTOR"] = None
+# results cached by upload hash: in-memory LRU budget (0 disables the cache)
+# and an optional directory for a disk tier that survives restarts
+app.config["INSPECT_CACHE_MEM_BYTES"] = 32 * 1024 * 1024
+app.config["INSPECT_CACHE_DIR"] = None
+app.config["INSPECT_CACHE_DISK_BYTES"] = 512 * 1024 * 1024
+
+_cache = None
+# (upload digest, track) -> tempos/checkpoints for time-range queries; a few
+# KB per track, so kept even when the result cache is disabled
+TIMELINE_MEMO_SIZE = 64
+_timelines = OrderedDict()
+
+def _get_cache():
+    global _cache
+    if _cache is None and app.config["INSPECT_CACHE_MEM_BYTES"]:
+        _cache = ResultCache(app.config["INSPECT_CACHE_MEM_BYTES"], app.config["INSPECT_CACHE_DIR"],
+                             app.config["INSPECT_CACHE_DISK_BYTES"])
+    return _cache
+
+RESULT_SCHEMA = 3   # bump when cached result shapes change
+_PARSE_ERRORS = (RuntimeError, IndexError, struct.error)   # raised by the scan for malformed files
+
+def _cache_get(key):
+    cache = _get_cache()
+    data = cache.get(f"{RESULT_SCHEMA}:{key}") if cache else None
+    return None if data is None else json.loads(data)
+
+def _cache_put(key, value):
+    cache = _get_cache()
+    if cache: cache.put(f"{RESULT_SCHEMA}:{key}", json.dumps(value, separators=(",", ":")).encode())
+
 @app.route("/", methods=["GET","POST"])
 def index():
     result = ""
     if request.method == "POST" and "mid" in request.files:
         f = request.files["mid"]
-        data = f.read()
-        try:
-            result = inspect_midi_bytes(data)
-        except Exception as e:
-            result = "Error: " + html.escape(str(e))
-    return render_template_string(PAGE, result=result)
+        key = "inspect:" + _upload_digest(f.stream)
+        cached = _cache_get(key)
+        if cached is not None:
+            result = cached["report"]
+        else:
+            scan = None
+            workers = app.config["INSPECT_WORKERS"]
+            executor = app.config["CPU_EXECUTOR"]
+            nbytes = f.stream.seek(0, io.SEEK_END); f.stream.seek(0)
+            t0 = time.perf_counter()
+            deterministic = True
+            try:
+                if executor is not None:
+                    scan = _scan_upload_in(executor, f.stream)
+                elif workers:
+                    data = _map_upload(f)
+                    try:
+                        scan = scan_midi(data, workers=workers)
+                    finally:
+                        if isinstance(data, mmap.mmap): data.close()
+                else:
+                    scan = scan_midi_stream(f.stream)
+                _record_scan(scan, nbytes, time.perf_counter() - t0)
+                result = format_report(scan)
+            except Exception as e:
+                result = "Error: " + html.escape(str(e))
+                # only errors in the file itself are worth remembering; a broken or
+                # recycled pool (a RuntimeError too) must not stick to the upload
+                deterministic = isinstance(e, _PARSE_ERRORS) and not isinstance(e, BrokenExecutor)
+            if deterministic: _cache_put(key, {"scan": scan, "report": result})
+    return PAGE_T.render(result=result) if result else INDEX_HTML
+
+@app.route("/api/inspect", methods=["POST"])
+def api_inspect():
+    # JSON header and track index; ?track=N (1-based) also decodes that track.
+    # ?start=S&end=E (seconds) returns the events in that wall-clock range instead.
+    if "mid" not in request.files: return jsonify(error="missing 'mid' file"), 400
+    track = request.args.get("track", type=int)
+    f = request.files["mid"]
+    digest = _upload_digest(f.stream)
+    data = None
+
+    def upload():
+        nonlocal data
+        if data is None: data = _map_upload(f)
+        return data
+
+    def summary(entry):
+        key = f"track:{digest}:{entry['track']}"
+        trk = _cache_get(key)
+        if trk is None:
+            trk = scan_track(upload(), entry)
+            _cache_put(key, trk)
+        return trk
+
+    def timeline(entry):
+        # a cached full summary serves too; otherwise the light pass, kept
+        # whether or not the result cache is enabled
+        key = (digest, entry["track"])
+        tl = _timelines.pop(key, None) or _cache_get(f"track:{digest}:{entry['track']}")
+        if tl is None: tl = track_timeline(upload(), entry)
+        if len(_timelines) >= TIMELINE_MEMO_SIZE: _timelines.popitem(last=False)
+        _timelines[key] = {"tempos": tl["tempos"], "checkpoints": tl["checkpoints"]}
+        return tl
+
+    try:
+        result = _cache_get("index:" + digest)
+        if result is None:
+            result = index_tracks(upload())
+            _cache_put("index:" + digest, result)
+        if track is not None and not 1 <= track <= len(result["tracks"]):
+            return jsonify(error=f"track must be between 1 and {len(result['tracks'])}"), 404
+        start, end = request.args.get("start", type=float), request.args.get("end", type=float)
+        if start is not None or end is not None:
+            tracks = [track] if track is not None else None
+            return jsonify(query_time_range(upload(), start or 0.0, end, tracks, timeline,
+                                            request.args.get("limit", 10000, type=int)))
+        if track is not None:
+            entry = result["tracks"][track - 1]
+            entry.update(summary(entry))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify(error=str(e)), 400
+    finally:
+        if isinstance(data, mmap.mmap): data.close()
+
+@app.route("/api/cache")
+def api_cache():
+    cache = _get_cache()
+    return jsonify(cache.stats() if cache else {"enabled": False})
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,30 @@
+# bench_chords.py
+# Tokens/sec of chord compilation: the regex/set path vs the precompiled table + LRU.
+# Usage: python benchmarks/bench_chords.py [--tokens 100000]
+import argparse, os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..")]
+import chord_mid_app
+from corpus import chord_tokens
+from timing import best_of
+
+def rate(fn, tokens, repeat):
+    return len(tokens) / best_of(lambda: [fn(t) for t in tokens], repeat)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    # the rare tokens are random spellings from the whole grammar, mostly not in CHORD_TABLE
+    for label, rare in (("common", 0.0), ("10% rare", 0.1), ("all rare", 1.0)):
+        tokens = chord_tokens(args.tokens, seed=1, common=1 - rare, valid_only=True)
+        chord_mid_app._chord_lru.clear()
+        slow = rate(chord_mid_app._compile_token, tokens, args.repeat)
+        fast = rate(chord_mid_app.chord_notes, tokens, args.repeat)
+        print(f"{label:9s}: compile {slow/1e3:7.0f}k tok/s  table+lru {fast/1e3:7.0f}k tok/s  -> {fast/slow:.1f}x")
+
+if __name__ == "__main__":
+    main()
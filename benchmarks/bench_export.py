@@ -0,0 +1,33 @@
+# bench_export.py
+# Exports/sec of chord_mid_app.write_mid: byte-level writer vs mido objects.
+# Usage: python benchmarks/bench_export.py [--chords 64] [--repeat 5]
+import argparse, os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..")]
+import chord_mid_app
+from corpus import chord_tokens
+from timing import best_of
+
+def bench(tokens, use_mido, seconds, repeat):
+    chord_mid_app.USE_MIDO_WRITER = use_mido
+    return 1 / best_of(lambda: chord_mid_app.write_mid(tokens, bpm=120, bars=2), repeat, min_time=seconds)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chords", type=int, nargs="+", default=[8, 64, 512])
+    ap.add_argument("--seconds", type=float, default=1.0, help="time per measurement")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    tokens = chord_tokens(max(args.chords), seed=1, valid_only=True)
+    a = chord_mid_app.write_mid(tokens).getvalue()
+    chord_mid_app.USE_MIDO_WRITER = True
+    assert chord_mid_app.write_mid(tokens).getvalue() == a, "writers disagree"
+    for n in args.chords:
+        native = bench(tokens[:n], False, args.seconds, args.repeat)
+        mido = bench(tokens[:n], True, args.seconds, args.repeat)
+        print(f"{n:5d} chords: native {native:9.0f}/s  mido {mido:8.0f}/s  -> {native/mido:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# bench_inspect.py
+# Events/sec of the MIDI inspector on dense synthetic files.
+# Usage: python benchmarks/bench_inspect.py [--events 1000000] [--against OLD_APP.py]
+#   e.g. git show <rev>:app.py > /tmp/app_before.py
+#        python benchmarks/bench_inspect.py --against /tmp/app_before.py
+import argparse, importlib.util, os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..")]
+import app
+from corpus import dense_smf
+from timing import best_of
+
+def load(path):
+    spec = importlib.util.spec_from_file_location("app_before", path)
+    mod = importlib.util.module_from_spec(spec); spec.loader.exec_module(mod)
+    return mod
+
+def bench(fn, data, n_events, repeat):
+    best = best_of(lambda: fn(data), repeat)
+    return n_events / best, best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=1_000_000)
+    ap.add_argument("--tracks", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--against", help="app.py from an older revision to compare with")
+    args = ap.parse_args()
+
+    # the pre-rewrite parser mis-decodes running status, so compare on explicit status bytes
+    cases = [("explicit status", dense_smf(args.events, args.tracks, running_status=False))]
+    if not args.against:
+        cases.append(("running status", dense_smf(args.events, args.tracks, running_status=True)))
+    for label, data in cases:
+        print(f"{label}: {len(data)/1e6:.1f} MB, {args.events} events")
+        rate, dt = bench(app.inspect_midi_bytes, data, args.events, args.repeat)
+        print(f"  current : {rate/1e6:6.2f} M events/s  ({dt:.3f} s)")
+        if args.against:
+            old = load(args.against)
+            rate0, dt0 = bench(old.inspect_midi_bytes, data, args.events, args.repeat)
+            print(f"  before  : {rate0/1e6:6.2f} M events/s  ({dt0:.3f} s)  -> {rate/rate0:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# bench_tokenizer.py
+# Differential check of the hand-written chord parser against the CHORD_RE
+# reference, then tokens/sec on multi-megabyte progressions.
+# Usage: python benchmarks/bench_tokenizer.py [--fuzz 200000] [--mb 1 8] [--repeat 3]
+# Exits 1 if any token or text parses differently from the reference.
+import argparse, os, random, re, sys
+from collections import OrderedDict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..")]
+import chord_mid_app as cm
+from corpus import chord_tokens, random_token
+from timing import best_of
+
+# characters the grammar (or re.I) cares about, plus some it does not
+NOISE = list("ABCDEFGabcdefgmMjJsSuUiI#b+-0123456789/()x") + [u"ø", u"Ø", u"İ", u"ı",
+                                                           u"ſ", u"K", u"♭", u"♯", "\n"]
+SEPARATORS = [" ", "  ", ",", ", ", "\t", "\n", " - ", u" – ", u"—", u" ", "\x1c", " | "]
+
+def mutate(r, tok):
+    tok = list(tok)
+    for _ in range(r.choice((0, 1, 1, 2, 3))):
+        k = r.randrange(len(tok) + 1); op = r.random()
+        if op < 0.4: tok.insert(k, r.choice(NOISE))
+        elif op < 0.6 and k < len(tok): del tok[k]
+        elif k < len(tok): tok[k] = tok[k].swapcase()
+    return "".join(tok)
+
+def fuzz_tokens(n, seed):
+    r = random.Random(seed)
+    for _ in range(n):
+        yield mutate(r, random_token(r))
+
+def reference_split(text):
+    return [t for t in re.split(r"[\s,]+", cm.sanitize(text)) if t and t != "-"]
+
+def reference_notes(tokens):
+    # the previous lookup: sanitize + re.split, CHORD_TABLE, then an LRU over CHORD_RE
+    lru = OrderedDict(); out = []
+    for t in tokens:
+        notes = cm.CHORD_TABLE.get(t)
+        if notes is None:
+            try:
+                notes = lru.pop(t)
+            except KeyError:
+                notes = cm._compile_token(t)
+                if len(lru) >= cm.CHORD_CACHE_SIZE: lru.popitem(last=False)
+            lru[t] = notes
+        out.append(list(notes) if notes is not None else None)
+    return out
+
+def check(n, seed):
+    bad = 0
+    for tok in fuzz_tokens(n, seed):
+        want = cm._compile_token(tok)
+        if cm.parse_chord(tok) != want or cm.chord_token_to_midi_notes(tok) != (list(want) if want else None):
+            bad += 1
+            if bad <= 10: print(f"  token {tok!r}: reference {want}, parse_chord {cm.parse_chord(tok)}")
+    r = random.Random(seed)
+    for _ in range(n // 20):
+        text = "".join(r.choice(SEPARATORS) + mutate(r, random_token(r)) for _ in range(r.randrange(1, 12)))
+        if cm.split_progression(text) != reference_split(text):
+            bad += 1
+            if bad <= 10: print(f"  text {text!r}: reference {reference_split(text)}, got {cm.split_progression(text)}")
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fuzz", type=int, default=200_000, help="random tokens for the differential check")
+    ap.add_argument("--mb", type=float, nargs="+", default=[1, 8], help="progression text sizes in MB")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    bad = check(args.fuzz, args.seed)
+    print(f"differential check: {args.fuzz} tokens, {bad} mismatches")
+    if bad: return 1
+
+    # cold path: distinct spellings, no table or cache in front
+    tokens = [random_token(random.Random(k)) for k in range(20_000)]
+    def cold():
+        cm._body_memo.clear()
+        return [cm.parse_chord(t) for t in tokens]
+    slow = best_of(lambda: [cm._compile_token(t) for t in tokens], args.repeat)
+    fast = best_of(cold, args.repeat)
+    print(f"cold parse : regex {len(tokens)/slow/1e3:7.0f}k tok/s  hand-written {len(tokens)/fast/1e3:7.0f}k tok/s"
+          f"  -> {slow/fast:.1f}x")
+
+    for mb, common in ((mb, common) for mb in args.mb for common in (1.0, 0.8)):
+        # common=0.8: a fifth of the tokens are random spellings from the whole grammar
+        words = chord_tokens(int(mb * 1e6 / 5), seed=args.seed, common=common, valid_only=True)
+        text = ", ".join(" ".join(words[k:k + 4]) for k in range(0, len(words), 4))
+        def before():
+            return reference_notes(reference_split(text))
+        def after():
+            cm._chord_lru.clear(); cm._body_memo.clear()
+            return cm.parse_progression(text)
+        assert after()[1] == [tuple(c) for c in before()]
+        slow, fast = best_of(before, args.repeat), best_of(after, args.repeat)
+        print(f"{len(text)/1e6:5.1f} MB, {common:.0%} common: sanitize+split+lookup {len(words)/slow/1e6:5.2f}M tok/s  "
+              f"parse_progression {len(words)/fast/1e6:5.2f}M tok/s  -> {slow/fast:.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
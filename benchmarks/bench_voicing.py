@@ -0,0 +1,44 @@
+# bench_voicing.py
+# Chords/sec of the voice-leading engine and how much it smooths the voicing.
+# Usage: python benchmarks/bench_voicing.py [--chords 1000 10000 50000] [--repeat 3]
+# Time per chord should stay flat as progressions grow (the DP is linear).
+import argparse, os, sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..")]
+import chord_mid_app
+from corpus import COMMON, chord_tokens
+from timing import best_of
+
+def motion(a, b):
+    # the engine's cost: bass motion plus nearest-voice distances both ways
+    return (abs(a[0] - b[0]) + sum(min(abs(x - y) for y in b[1:]) for x in a[1:])
+            + sum(min(abs(x - y) for x in a[1:]) for y in b[1:]))
+
+def mean_motion(chords):
+    return sum(motion(a, b) for a, b in zip(chords, chords[1:])) / max(1, len(chords) - 1)
+
+def bench(parsed, repeat):
+    def voice():
+        chord_mid_app._voicing_table.clear()
+        return chord_mid_app.voice_progression(parsed)
+    return best_of(voice, repeat), voice()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chords", type=int, nargs="+", default=[1000, 10_000, 50_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    corpora = (("tune loop", lambda n: [COMMON[k % 8] for k in range(n)]),
+               ("common", lambda n: chord_tokens(n, common=1.0, valid_only=True)),
+               ("mixed", lambda n: chord_tokens(n, valid_only=True)))
+    for label, make in corpora:
+        for n in args.chords:
+            parsed = chord_mid_app.compile_progression(make(n))
+            dt, voiced = bench(parsed, args.repeat)
+            print(f"{label:9s} {n:6d} chords: {n/dt/1e3:7.1f}k chords/s  {dt/n*1e6:6.1f} us/chord  "
+                  f"motion/change block {mean_motion(parsed):5.1f} -> smooth {mean_motion(voiced):5.1f}")
+
+if __name__ == "__main__":
+    main()
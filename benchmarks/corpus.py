@@ -0,0 +1,125 @@
+# corpus.py
+# Deterministic benchmark inputs: synthetic Standard MIDI Files (format 0/1,
+# running status, dense CC, sysex, many tracks, 1 KB .. 500 MB) and chord-token
+# streams covering the CHORD_RE vocabulary. Same seed, same bytes.
+import random, struct
+
+def vlq(n):
+    out = [n & 0x7F]; n >>= 7
+    while n:
+        out.append(0x80 | (n & 0x7F)); n >>= 7
+    return bytes(reversed(out))
+
+def _meta(mtype, payload, delta=0):
+    return vlq(delta) + bytes((0xFF, mtype)) + vlq(len(payload)) + payload
+
+def _segment(r, nbytes, channel):
+    # Channel events with running status, runs of controller sweeps and pitch
+    # bends, sparse sysex and text. Starts with an explicit status byte so
+    # segments can be concatenated in any order.
+    out = bytearray(); running = None
+    def emit(status, *data, delta=0):
+        nonlocal running
+        out.extend(vlq(delta))
+        if status != running: out.append(status)
+        out.extend(data); running = status
+    while len(out) < nbytes:
+        x = r.random(); ch = channel if r.random() < 0.9 else r.randrange(16)
+        if x < 0.35:
+            note = r.randrange(24, 108)
+            emit(0x90 | ch, note, r.randrange(1, 128), delta=r.choice((0, 0, 30, 60, 120)))
+            emit(0x80 | ch, note, 64, delta=r.randrange(1, 480))
+        elif x < 0.6:   # dense CC sweep under running status
+            cc = r.choice((1, 7, 10, 11, 64, 74))
+            for v in range(r.randrange(8, 64)): emit(0xB0 | ch, cc, v & 0x7F, delta=r.randrange(0, 4))
+        elif x < 0.8:
+            for _ in range(r.randrange(4, 32)): emit(0xE0 | ch, r.randrange(128), r.randrange(128), delta=r.randrange(0, 4))
+        elif x < 0.9:
+            emit(0xC0 | ch, r.randrange(128)) if r.random() < 0.5 else emit(0xD0 | ch, r.randrange(128))
+        elif x < 0.97:
+            data = bytes(r.randrange(128) for _ in range(r.randrange(4, 48)))
+            out.extend(vlq(r.randrange(0, 10)) + b"\xF0" + vlq(len(data) + 1) + data + b"\xF7"); running = None
+        else:
+            out.extend(_meta(0x01, b"cue %d" % r.randrange(1000), r.randrange(0, 10))); running = None
+    return bytes(out)
+
+def _track_prefix(t, fmt):
+    out = _meta(0x03, b"Track %d" % t)
+    if t == 0 or fmt == 0:
+        out += _meta(0x51, b"\x07\xA1\x20") + _meta(0x58, b"\x04\x02\x18\x08") + _meta(0x59, b"\x00\x00")
+    return out
+
+def write_smf(fp, size, fmt=1, tracks=8, seed=0, segment=64 * 1024):
+    # Write an SMF of about `size` bytes to `fp`; returns the bytes written.
+    # Each track tiles a few pre-generated segments, so 500 MB costs seconds.
+    if fmt == 0: tracks = 1
+    r = random.Random(seed)
+    body = max(64, (size - 14) // tracks - 8)
+    seg_len = min(segment, body)
+    written = fp.write(b"MThd" + struct.pack(">IHHH", 6, fmt, tracks, 480))
+    for t in range(tracks):
+        pool = [_segment(r, seg_len, t % 16) for _ in range(4 if body > seg_len else 1)]
+        prefix = _track_prefix(t, fmt)
+        picks = []; n = len(prefix)
+        while n < body - 4:
+            picks.append(r.randrange(len(pool))); n += len(pool[picks[-1]])
+        written += fp.write(b"MTrk" + struct.pack(">I", n + 4) + prefix)
+        for k in picks: written += fp.write(pool[k])
+        written += fp.write(b"\x00\xFF\x2F\x00")
+    return written
+
+def smf_bytes(size, fmt=1, tracks=8, seed=0):
+    import io
+    buf = io.BytesIO(); write_smf(buf, size, fmt, tracks, seed)
+    return buf.getvalue()
+
+def dense_smf(n_events, tracks=1, running_status=True, seed=1):
+    # Exactly n_events channel events per file (note pairs, CC, pitch bend,
+    # program) and no sysex; running_status=False spells out every status byte.
+    r = random.Random(seed)
+    per = n_events // tracks
+    chunks = []
+    for t in range(tracks):
+        trk = bytearray(_meta(0x03, b"T%d" % t) + _meta(0x51, b"\x07\xA1\x20"))
+        running = None
+        for k in range(per):
+            ch = r.randrange(16) if not running_status else (k // 64) % 16
+            x = r.random()
+            if x < 0.4: msg = (0x90 | ch, r.randrange(128), r.randrange(1, 128))
+            elif x < 0.75: msg = (0x80 | ch, r.randrange(128), 64)
+            elif x < 0.9: msg = (0xB0 | ch, r.randrange(128), r.randrange(128))
+            elif x < 0.98: msg = (0xE0 | ch, r.randrange(128), r.randrange(128))
+            else: msg = (0xC0 | ch, r.randrange(128))
+            trk += vlq(r.randrange(0, 240) if x < 0.5 else 0)
+            if running_status and msg[0] == running: trk += bytes(msg[1:])
+            else: trk += bytes(msg)
+            running = msg[0]
+        trk += b"\x00\xFF\x2F\x00"
+        chunks.append(b"MTrk" + struct.pack(">I", len(trk)) + bytes(trk))
+    hdr = b"MThd" + struct.pack(">IHHH", 6, 1 if tracks > 1 else 0, tracks, 480)
+    return hdr + b"".join(chunks)
+
+# -- chord tokens
+
+ROOTS = [l + a for l in "CDEFGAB" for a in ("", "#", "b")]
+QUALITIES = ["", "m7b5", "ø7", "ø", "maj7", "m7", "7", "maj", "m", "dim", "aug", "+", "sus2", "sus4"]
+SEVENTHS = ["", "maj7", "m7", "7"]
+SHORTHANDS = ["", "add9", "madd9", "maj9", "m9", "9", "11", "13", "6", "m6"]
+TENSIONS = ["b9", "#9", "9", "11", "#11", "b13", "13"]
+COMMON = ["C", "Dm7", "G7", "Cmaj7", "Am7", "F", "Em7b5", "A7", "Bbmaj7", "F#m7", "Ebadd9", "Db13", "Gsus4", "Abm6"]
+
+def random_token(r, valid_only=False):
+    # root, quality, seventh, shorthand and stacked tensions, as CHORD_RE reads them;
+    # roots such as "Cb" and "E#" match the regex but are not playable
+    while True:
+        q = r.choice(QUALITIES)
+        tok = (r.choice(ROOTS) + q + (r.choice(SEVENTHS) if q and r.random() < 0.3 else "")
+               + (r.choice(SHORTHANDS) if r.random() < 0.4 else "")
+               + "".join(r.sample(TENSIONS, r.choice((0, 0, 0, 1, 2)))))
+        if r.random() < 0.05: tok = tok.lower()
+        if not valid_only or tok[:2] not in ("Cb", "Fb", "E#", "B#", "cb", "fb", "e#", "b#"): return tok
+
+def chord_tokens(n, seed=0, common=0.8, valid_only=False):
+    # `common` of the tokens come from a small everyday set, the rest from the full grammar
+    r = random.Random(seed)
+    return [r.choice(COMMON) if r.random() < common else random_token(r, valid_only) for _ in range(n)]
@@ -0,0 +1,77 @@
+# loadgen.py
+# Closed-loop HTTP load generator: N clients with keep-alive connections request
+# a page for a fixed time, fetching the page's /assets/ files once per client the
+# way a browser cache would. Reports throughput, bytes per page view and latency.
+# Usage: python benchmarks/loadgen.py http://127.0.0.1:5000/ [-c 32] [-d 10] [--gzip]
+#        python benchmarks/loadgen.py http://127.0.0.1:5000/ --post chords="Dm7 G7 Cmaj7"
+#        python benchmarks/loadgen.py http://127.0.0.1:5000/ --upload song.mid
+import argparse, http.client, json, re, threading, time
+from urllib.parse import urlencode, urlsplit
+
+ASSET_RE = re.compile(rb'(?:href|src)="(/assets/[^"]+)"')
+
+def percentile(xs, q):
+    return xs[min(len(xs) - 1, int(q * len(xs)))] if xs else None
+
+def client(url, args, deadline, stats, lock):
+    u = urlsplit(url)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+    headers = {"Accept-Encoding": "gzip, br" if args.gzip else "identity"}
+    body = None
+    if args.post:
+        body = urlencode([tuple(kv.split("=", 1)) for kv in args.post])
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    elif args.upload:
+        with open(args.upload, "rb") as fh: payload = fh.read()
+        body = (b"--loadgen\r\nContent-Disposition: form-data; name=\"mid\"; filename=\"upload.mid\"\r\n"
+                b"Content-Type: audio/midi\r\n\r\n" + payload + b"\r\n--loadgen--\r\n")
+        headers["Content-Type"] = "multipart/form-data; boundary=loadgen"
+    seen = set(); lat = []; nbytes = 0; views = 0; errors = 0; busy = 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST" if body else "GET", u.path or "/", body, headers)
+            resp = conn.getresponse(); data = resp.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1; conn.close(); continue
+        if resp.status == 503: busy += 1; continue
+        lat.append(time.perf_counter() - t0)
+        if resp.status >= 400: errors += 1
+        nbytes += len(data); views += 1
+        for path in ASSET_RE.findall(data) if resp.getheader("Content-Encoding") is None else ():
+            if path in seen: continue
+            seen.add(path)
+            conn.request("GET", path.decode(), headers=headers)
+            nbytes += len(conn.getresponse().read())
+    conn.close()
+    with lock:
+        stats["lat"] += lat; stats["bytes"] += nbytes; stats["views"] += views; stats["errors"] += errors; stats["busy"] += busy
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("url")
+    ap.add_argument("-c", "--clients", type=int, default=32)
+    ap.add_argument("-d", "--duration", type=float, default=10.0)
+    ap.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip, br")
+    ap.add_argument("--post", nargs="*", metavar="FIELD=VALUE", help="POST these form fields instead of GET")
+    ap.add_argument("--upload", metavar="FILE", help="POST this file as the `mid` upload field")
+    args = ap.parse_args()
+
+    stats = {"lat": [], "bytes": 0, "views": 0, "errors": 0, "busy": 0}; lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [threading.Thread(target=client, args=(args.url, args, deadline, stats, lock)) for _ in range(args.clients)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+    lat = sorted(stats["lat"])
+    print(json.dumps({
+        "clients": args.clients, "seconds": round(elapsed, 2), "requests": stats["views"], "errors": stats["errors"], "rejected_503": stats["busy"],
+        "req_per_sec": round(stats["views"] / elapsed, 1),
+        "bytes_per_view": round(stats["bytes"] / stats["views"]) if stats["views"] else None,
+        "p50_ms": round(percentile(lat, 0.50) * 1e3, 2) if lat else None,
+        "p99_ms": round(percentile(lat, 0.99) * 1e3, 2) if lat else None,
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# suite.py
+# Reproducible benchmark suite with a regression gate.
+#   python benchmarks/suite.py                          # run, print results
+#   python benchmarks/suite.py --save benchmarks/baseline.json
+#   python benchmarks/suite.py --baseline benchmarks/baseline.json --threshold 0.2
+# With --baseline, exits 1 if any case is more than `threshold` slower than its baseline.
+# Sizes take K/M suffixes; files over 64M are generated to a temp file and mmapped.
+import argparse, contextlib, io, json, mmap, os, platform, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..")]
+import app, chord_mid_app, to_mid
+from corpus import chord_tokens, smf_bytes, write_smf
+from timing import best_of
+
+def parse_size(s):
+    mult = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}.get(s[-1].upper(), 1)
+    return int(float(s.rstrip("KkMmGg")) * mult)
+
+@contextlib.contextmanager
+def smf_input(size, fmt, tracks):
+    if size <= 64 << 20:
+        yield smf_bytes(size, fmt, tracks); return
+    with tempfile.TemporaryFile() as fh:
+        write_smf(fh, size, fmt, tracks); fh.flush()
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm: yield mm
+
+def run(args):
+    results = {}
+    def record(case, value, unit):
+        results[case] = {"value": round(value, 3), "unit": unit}
+        print(f"  {case:36s} {value:12.1f} {unit}", flush=True)
+
+    for size in map(parse_size, args.sizes):
+        for fmt, tracks in ((0, 1), (1, args.tracks)):
+            with smf_input(size, fmt, tracks) as data:
+                dt = best_of(lambda: app.inspect_midi_bytes(data), args.repeat)
+                record(f"inspect_midi_bytes/fmt{fmt}/{size >> 10}K", len(data) / dt / 1e6, "MB/s")
+    # many short tracks: per-track fixed costs dominate here, not the event loop
+    data = smf_bytes(args.small_tracks * 512, 1, args.small_tracks)
+    dt = best_of(lambda: app.inspect_midi_bytes(data), args.repeat)
+    record(f"inspect_midi_bytes/fmt1/{args.small_tracks}x512B", len(data) / dt / 1e6, "MB/s")
+
+    tokens = chord_tokens(args.tokens)
+    def lookup():
+        chord_mid_app._chord_lru.clear()
+        for t in tokens: chord_mid_app.chord_token_to_midi_notes(t)
+    record(f"chord_token_to_midi_notes/{args.tokens}", args.tokens / best_of(lookup, args.repeat), "tokens/s")
+
+    prog = chord_tokens(args.chords, seed=1, valid_only=True)
+    record(f"chord_mid_app.write_mid/{args.chords}", 1 / best_of(lambda: chord_mid_app.write_mid(prog), args.repeat),
+           "files/s")
+    long_prog = chord_mid_app.compile_progression(chord_tokens(args.voiced, seed=2, valid_only=True))
+    def voice():
+        chord_mid_app._voicing_table.clear()
+        chord_mid_app.voice_progression(long_prog)
+    record(f"voice_progression/{args.voiced}", args.voiced / best_of(voice, args.repeat), "chords/s")
+    with tempfile.TemporaryDirectory() as d, contextlib.redirect_stdout(io.StringIO()):
+        out = os.path.join(d, "chords.mid")
+        dt = best_of(lambda: to_mid.write_mid(out, bpm=90, numer=4, denom=4), args.repeat)
+    record("to_mid.write_mid", 1 / dt, "files/s")
+    return results
+
+def compare(results, baseline, threshold):
+    # every unit is higher-is-better
+    failed = []
+    for case, base in sorted(baseline["results"].items()):
+        cur = results.get(case)
+        if cur is None: continue
+        ratio = cur["value"] / base["value"] if base["value"] else float("inf")
+        flag = "REGRESSION" if ratio < 1 - threshold else ""
+        print(f"  {case:36s} {ratio:6.2f}x baseline {flag}")
+        if flag: failed.append(case)
+    return failed
+
+def main():
+    ap = argparse.ArgumentParser(description="MIDI inspector / chord exporter benchmark suite")
+    ap.add_argument("--sizes", nargs="+", default=["1K", "64K", "1M", "16M"], help="SMF sizes, e.g. 1K 1M 500M")
+    ap.add_argument("--tracks", type=int, default=16, help="tracks in the format-1 files")
+    ap.add_argument("--small-tracks", type=int, default=128, help="tracks in the file of 512-byte tracks")
+    ap.add_argument("--tokens", type=int, default=100_000)
+    ap.add_argument("--chords", type=int, default=64, help="progression length for write_mid")
+    ap.add_argument("--voiced", type=int, default=20_000, help="progression length for voice_progression")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--save", metavar="JSON", help="write results as a new baseline")
+    ap.add_argument("--baseline", metavar="JSON", help="compare against this baseline")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    results = run(args)
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "created": time.strftime("%Y-%m-%d"), "results": results}, fh, indent=1, sort_keys=True)
+            fh.write("\n")
+    if args.baseline:
+        with open(args.baseline) as fh: baseline = json.load(fh)
+        failed = compare(results, baseline, args.threshold)
+        if failed:
+            print(f"{len(failed)} case(s) regressed more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,15 @@
+# timing.py
+# The one timing loop the benchmarks share.
+import time
+
+def best_of(fn, repeat, min_time=0.3):
+    # best per-call time; cheap calls are looped until `min_time` has passed
+    best = None
+    for _ in range(repeat):
+        n = 0; t0 = time.perf_counter()
+        while True:
+            fn(); n += 1
+            dt = time.perf_counter() - t0
+            if dt >= min_time or dt * 100 >= min_time * n: break
+        best = dt / n if best is None else min(best, dt / n)
+    return best
@@ -1,10 +1,33 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, unicode_literals
-from flask import Flask, request, render_template_string, send_file
-import io, re
-from mido import Message, MidiFile, MidiTrack, MetaMessage, bpm2tempo
+from flask import Flask, Response, request, jsonify
+import csv, hashlib, io, json, os, re, struct, time, zipfile
+from collections import OrderedDict
+from itertools import chain, islice
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+import metrics
+from result_cache import ResultCache
+from static_assets import StaticAssets
+from smf_writer import bpm2tempo, chord_track_smf, iter_chord_track_smf
+try:
+  from mido import Message, MidiFile, MidiTrack, MetaMessage
+except ImportError:  # optional: only used when USE_MIDO_WRITER is set
+  MidiFile = None
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)
+
+USE_MIDO_WRITER = False   # build files through mido objects instead of smf_writer
+BATCH_MAX_ITEMS = 20000   # progressions accepted by one /batch request
+BATCH_CHUNK = 64          # progressions handed to a worker at a time
+EXPORT_WORKERS = None     # /batch worker processes (None: one per CPU)
+EXPORT_CACHE_BYTES = 16 * 1024 * 1024   # finished exports kept for repeat requests
+WAV_RATE = 44100
+WAV_MAX_SECONDS = 3600       # longest progression /wav will render
+STREAM_MIN_TEXT = 64 * 1024  # progressions longer than this (chars) are streamed from /
+app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024
+app.config["CPU_EXECUTOR"] = None   # runs exports off the request thread when set (see serve.py)
+app.config["MAX_FORM_MEMORY_SIZE"] = app.config["MAX_CONTENT_LENGTH"]
 
 NOTE_TO_SEMITONE = {"C":0,"C#":1,"Db":1,"D":2,"D#":3,"Eb":3,"E":4,"F":5,"F#":6,"Gb":6,"G":7,"G#":8,"Ab":8,"A":9,"A#":10,"Bb":10,"B":11}
 
@@ -69,10 +92,16 @@ def build_intervals(baseQual, explicit7th, shorthand, extras):
 
   return sorted(st)
 
-def chord_token_to_midi_notes(token):
+def _compile_token(token):
+  # reference parser: CHORD_RE and split_tensions
   m = CHORD_RE.match(token)
   if not m: return None
   rootRaw, qualA, qualB, shorthand, extraStr = m.groups()
+  rootName = rootRaw[0].upper() + (rootRaw[1:] if len(rootRaw)>1 else "")
+  if rootName not in NOTE_TO_SEMITONE: return None
+  return _chord_from_intervals(rootName, _group_intervals(qualA, qualB, shorthand, split_tensions(extraStr or "")))
+
+def _group_intervals(qualA, qualB, shorthand, extras):
   baseQual = (qualA or "").lower()
   if baseQual == "maj": baseQual = ""
   if baseQual == u"\u00f8": baseQual = u"\u00f87"  # ø -> ø7
@@ -81,20 +110,248 @@ def chord_token_to_midi_notes(token):
     explicit7th = qualB.lower()
   elif qualA and qualA.lower() in ("maj7","m7","7") and baseQual not in ("m7b5", u"\u00f87", u"\u00f8"):
     explicit7th = qualA.lower(); baseQual = ""
-  extras = split_tensions(extraStr or "")
-  rootName = rootRaw[0].upper() + (rootRaw[1:] if len(rootRaw)>1 else "")
-  if rootName not in NOTE_TO_SEMITONE: return None
-  intervals = build_intervals(baseQual, explicit7th, shorthand or "", extras)
+  return build_intervals(baseQual, explicit7th, shorthand or "", extras)
+
+def _chord_from_intervals(rootName, intervals):
   rootMidi = 60 + NOTE_TO_SEMITONE[rootName]
   notes = [rootMidi - 12] + [rootMidi + semi for semi in intervals]
-  return [n-12 if n>76 else n for n in notes]
+  return tuple([n-12 if n>76 else n for n in notes])
+
+# Hand-written CHORD_RE: alternatives indexed by first character and tried in
+# the regex's order, with the same backtracking, on a case-folded copy of the
+# text (_FOLD maps exactly the characters re.I equates with the grammar's).
+# Tensions are prefix-free, so they are read greedily without backtracking.
+# Everything after the root parses the same for every root, so its intervals
+# are memoized and a new spelling usually costs one dict lookup.
+_FOLD = dict((ord(c), c.lower()) for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+_FOLD.update({0x130: "i", 0x131: "i", 0x17F: "s", 0xD8: u"\u00f8"})
+_ROOT_LETTERS = frozenset("ABCDEFGabcdefg")
+_ACCIDENTALS = frozenset("#bB")
+
+def _alternatives(*alts):
+  first = {}
+  for a in alts: first.setdefault(a[0], []).append(a)
+  return first
+
+_QUAL_A = _alternatives("m7b5", u"\u00f87", u"\u00f8", "maj7", "m7", "7", "maj", "m", "dim", "aug", "+", "sus2", "sus4")
+_QUAL_B = _alternatives("maj7", "m7", "7")
+_SHORTHAND = _alternatives("add9", "madd9", "maj9", "m9", "9", "11", "13", "6", "m6")
+_TENSION = _alternatives("b9", "#9", "9", "11", "#11", "b13", "13")
+BODY_CACHE_SIZE = 1 << 16
+_body_memo = {}   # text after the root -> intervals, or None if it does not parse
+
+def _match(alts, s, pos):
+  return [a for a in alts.get(s[pos:pos + 1], ()) if s.startswith(a, pos)]
+
+def _tensions(s, pos, end):
+  out = []
+  while pos < end:
+    for a in _TENSION.get(s[pos], ()):
+      if s.startswith(a, pos): break
+    else:
+      return None
+    out.append(a); pos += len(a)
+  return out
+
+def _parse_body(body):
+  s = body.translate(_FOLD)
+  end = len(s) - 1 if s.endswith("\n") else len(s)   # `$` also matches before a final newline
+  for a in _match(_QUAL_A, s, 0) + [""]:
+    pa = len(a)
+    for b in _match(_QUAL_B, s, pa) + [""]:
+      pb = pa + len(b)
+      for sh in _match(_SHORTHAND, s, pb) + [""]:
+        ps = pb + len(sh)
+        extras = _tensions(s, ps, end)
+        if extras is not None:
+          return tuple(_group_intervals(body[:pa] or None, body[pa:pb] or None, body[pb:ps], extras))
+  return None
+
+def parse_chord(token):
+  # same notes as _compile_token, or None
+  if token[:1] not in _ROOT_LETTERS: return None
+  for r in ((2, 1) if token[1:2] in _ACCIDENTALS else (1,)):
+    body = token[r:]
+    try:
+      intervals = _body_memo[body]
+    except KeyError:
+      if len(_body_memo) >= BODY_CACHE_SIZE: _body_memo.clear()
+      intervals = _body_memo[body] = _parse_body(body)
+    if intervals is not None:
+      rootName = token[0].upper() + token[1:r]
+      return _chord_from_intervals(rootName, intervals) if rootName in NOTE_TO_SEMITONE else None
+  return None
+
+# Spellings common enough to compile once at import, for every root; anything
+# else (stacked tensions, odd casing) is compiled on first use and kept in an LRU.
+COMMON_QUALITIES = ("", "m", "maj", "dim", "aug", "+", "sus2", "sus4", "7", "maj7", "m7", "m7b5",
+                    u"ø", u"ø7", "dim7", "mmaj7", "7sus4", "6", "m6", "9", "m9", "maj9",
+                    "add9", "madd9", "11", "m11", "13", "m13", "7b9", "7#9", "7#11", "7b13", "maj7#11")
+CHORD_TABLE = dict((root + q, notes) for root in NOTE_TO_SEMITONE for q in COMMON_QUALITIES
+                   for notes in [parse_chord(root + q)] if notes is not None)
+CHORD_CACHE_SIZE = 4096
+_chord_lru = OrderedDict()
+_MISSING = object()
+
+def chord_notes(token):
+  # tuple of MIDI notes for a chord token, or None if it does not parse
+  notes = CHORD_TABLE.get(token)
+  if notes is not None: return notes
+  notes = _chord_lru.pop(token, _MISSING)
+  if notes is _MISSING:   # unparseable tokens are cached too, as None
+    notes = parse_chord(token)
+    if len(_chord_lru) >= CHORD_CACHE_SIZE: _chord_lru.popitem(last=False)
+  _chord_lru[token] = notes
+  return notes
+
+def chord_token_to_midi_notes(token):
+  notes = chord_notes(token)
+  return list(notes) if notes is not None else None
+
+# sanitize and the [\s,]+ split without the regex: every replacement is one
+# character for one, so offsets in the normalized text are offsets in the input
+TOKEN_RE = re.compile(r"\S+")
+
+def _normalize(text):
+  return (text.replace(u"♭","b").replace(u"♯","#").replace("-", " ").replace(u"–"," ").replace(u"—"," ")
+              .replace(",", " "))
+
+def split_progression(text):
+  return _normalize(text).split()
+
+def scan_progression(text):
+  # lazily: (offset in text, token, notes or None) for every token
+  for m in TOKEN_RE.finditer(_normalize(text)):
+    t = m.group()
+    yield m.start(), t, chord_notes(t)
+
+def _lookup(tokens):
+  parsed = list(map(CHORD_TABLE.get, tokens))
+  if None in parsed:
+    parsed = [c if c is not None else chord_notes(t) for t, c in zip(tokens, parsed)]
+  return parsed
+
+def compile_progression(tokens):
+  parsed = _lookup(tokens)
+  if None in parsed:
+    raise ValueError("Unknown chord: {0}".format(tokens[parsed.index(None)]))
+  return parsed
+
+def parse_progression(text):
+  # (tokens, chords) for a progression; an unknown chord is reported with its offset
+  tokens = split_progression(text)
+  parsed = _lookup(tokens)
+  if None in parsed:
+    i = parsed.index(None)
+    pos = next(islice(TOKEN_RE.finditer(_normalize(text)), i, None)).start()
+    raise ValueError("Unknown chord: {0} (at character {1})".format(tokens[i], pos))
+  return tokens, parsed
+
+# -- voice leading: each chord takes one of a bounded set of candidate voicings
+# (inversions of its pitch classes placed in a fixed register over a root bass),
+# and a dynamic program picks the path with the least total motion. Work is
+# linear in progression length and at most MAX_VOICINGS**2 per chord change;
+# motion costs are computed once per distinct pair of chords.
+
+VOICING_RANGE = (52, 84)   # lowest and highest note of the upper voices
+BASS_RANGE = (36, 59)
+MAX_VOICINGS = 16
+_voicing_table = {}        # chord notes -> candidate voicings, bass first
+_FAR, _UNUSED = 1 << 12, 1 << 24   # padding voice / cost of a padding candidate
+
+def _voicings(notes):
+  cands = _voicing_table.get(notes)
+  if cands is not None: return cands
+  lo, hi = VOICING_RANGE
+  pcs = sorted(set(n % 12 for n in notes[1:]))
+  out = []
+  for r in range(len(pcs)):
+    # close position from the r-th inversion, each voice the next pitch class up
+    stack = [pcs[r]]
+    for pc in pcs[r + 1:] + pcs[:r]: stack.append(stack[-1] + (pc - stack[-1]) % 12)
+    for low in range(lo, lo + 24):
+      if low % 12 != pcs[r] or low - stack[0] + stack[-1] > hi: continue
+      upper = tuple(low - stack[0] + x for x in stack)
+      out.extend((b,) + upper for b in range(BASS_RANGE[0], min(BASS_RANGE[1] + 1, upper[0]))
+                 if b % 12 == notes[0] % 12)
+  # nearest the middle of the register first, so ties keep the default spacing
+  mid = (sum(VOICING_RANGE) / 2.0, sum(BASS_RANGE) / 2.0)
+  out.sort(key=lambda v: abs(sum(v[1:]) / (len(v) - 1.0) - mid[0]) + abs(v[0] - mid[1]))
+  if len(_voicing_table) >= CHORD_CACHE_SIZE: _voicing_table.clear()
+  cands = _voicing_table[notes] = out[:MAX_VOICINGS] or [tuple(notes)]
+  return cands
+
+def _motion(a, b):
+  # (pairs, K, K) cost between padded candidate blocks: bass motion plus, for
+  # every upper voice of either chord, the distance to the nearest upper voice
+  # of the other (chords may differ in size); padding candidates cost _UNUSED
+  ua, ub = a[:, :, None, 1:], b[:, None, :, 1:]
+  near_a = np.abs(ua - ub[..., :1]); near_b = np.abs(ub - ua[..., :1])
+  for v in range(1, ua.shape[-1]):
+    np.minimum(near_a, np.abs(ua - ub[..., v:v + 1]), out=near_a)
+    np.minimum(near_b, np.abs(ub - ua[..., v:v + 1]), out=near_b)
+  near_a[np.broadcast_to(ua >= _FAR, near_a.shape)] = 0
+  near_b[np.broadcast_to(ub >= _FAR, near_b.shape)] = 0
+  return (np.abs(a[:, :, None, 0] - b[:, None, :, 0]) + near_a.sum(axis=3, dtype=np.int32)
+          + near_b.sum(axis=3, dtype=np.int32) + np.where(b[:, None, :, 0] < _FAR, 0, _UNUSED))
+
+def voice_progression(parsed, chunk=256):
+  # parsed chords (from compile_progression) revoiced for minimal total motion
+  if not parsed: return []
+  chords, ids = {}, []
+  for c in parsed: ids.append(chords.setdefault(tuple(c), len(chords)))
+  cands = [_voicings(c) for c in chords]
+  table = np.full((len(cands), MAX_VOICINGS, max(len(v[0]) for v in cands)), _FAR, np.int16)
+  for i, v in enumerate(cands):
+    for k, notes in enumerate(v): table[i, k, :len(notes)] = notes
+  pairs, steps = {}, []
+  for i, j in zip(ids, ids[1:]): steps.append(pairs.setdefault((i, j), len(pairs)))
+  pairs = np.array(list(pairs), np.intp).reshape(-1, 2)
+  cost = np.empty((len(pairs), MAX_VOICINGS, MAX_VOICINGS), np.int32)
+  for p in range(0, len(pairs), chunk):
+    cost[p:p + chunk] = _motion(table[pairs[p:p + chunk, 0]], table[pairs[p:p + chunk, 1]])
+  total = np.where(table[ids[0], :, 0] < _FAR, 0, _UNUSED).astype(np.int64)
+  back = np.empty((len(steps), MAX_VOICINGS), np.intp); ks = np.arange(MAX_VOICINGS)
+  for n, p in enumerate(steps):
+    step = total[:, None] + cost[p]
+    best = back[n] = step.argmin(axis=0)
+    total = step[best, ks]
+  k = int(total.argmin()); path = [k]
+  for best in back[::-1]:
+    k = int(best[k]); path.append(k)
+  path.reverse()
+  return [cands[i][k] for i, k in zip(ids, path)]
+
+def write_mid(tokens, bpm=90, bars=1, numer=4, denom=4, program=0, velocity=96, track_name="Chord Track",
+              voicing="block"):
+  parsed = compile_progression(tokens)
+  if voicing == "smooth": parsed = voice_progression(parsed)
 
-def write_mid(tokens, bpm=90, bars=1, numer=4, denom=4, program=0, velocity=96, track_name="Chord Track"):
-  parsed = [chord_token_to_midi_notes(t) for t in tokens]
-  if any(v is None for v in parsed):
-    bad = tokens[[i for i,v in enumerate(parsed) if v is None][0]]
-    raise ValueError("Unknown chord: {0}".format(bad))
+  if USE_MIDO_WRITER and MidiFile is not None:
+    return _write_mid_mido(parsed, tokens, bpm, bars, numer, denom, program, velocity, track_name)
+  data = chord_track_smf(parsed, 480 * numer * bars, bpm2tempo(bpm), numer, denom, program, velocity,
+                         track_name, (" ".join(tokens))[:120])
+  return io.BytesIO(data)
 
+def stream_mid(text, bpm=90, bars=1, numer=4, denom=4, program=0, velocity=96, track_name="Chord Track",
+               voicing="block"):
+  # write_mid for very long progressions: chunks of the file from a generator,
+  # without materializing the token or chord lists. The text is tokenized twice
+  # (once to size the track), and unknown chords raise here, before any output.
+  # Smooth voicing needs the whole path, so it keeps the voiced chord list.
+  def chords():
+    for pos, t, notes in scan_progression(text):
+      if notes is None: raise ValueError("Unknown chord: {0} (at character {1})".format(t, pos))
+      yield notes
+  if voicing == "smooth":
+    voiced = voice_progression(list(chords()))
+    chords = lambda: voiced
+  label = (" ".join(t for _, t, _ in islice(scan_progression(text), 121)))[:120]
+  gen = iter_chord_track_smf(chords, 480 * numer * bars, bpm2tempo(bpm), numer, denom, program, velocity,
+                             track_name, label)
+  return chain([next(gen)], gen)
+
+def _write_mid_mido(parsed, tokens, bpm, bars, numer, denom, program, velocity, track_name):
   mid = MidiFile(type=0, ticks_per_beat=480)
   track = MidiTrack(); mid.tracks.append(track)
 
@@ -119,26 +376,84 @@ def write_mid(tokens, bpm=90, bars=1, numer=4, denom=4, program=0, velocity=96,
   bio = io.BytesIO(); mid.save(file=bio); bio.seek(0)
   return bio
 
+# -- audio: the browser preview's voice (attack 2 ms to 0.22, exponential decay
+# to 0.0005 over min(0.95 * chord, 2.5 s)) rendered offline with NumPy
+
+TONE_SECONDS = 2.5          # longest note the preview voice sounds
+TONE_CACHE_BYTES = 32 * 1024 * 1024   # per-pitch wavetables kept between renders
+MIX_CACHE_SIZE = 32         # mixed chord blocks kept while one render streams
+
+_tone_cache = OrderedDict()   # (pitch, rate, partials) -> TONE_SECONDS of unenveloped float32 wave
+_tone_bytes = 0
+
+def _tone(pitch, rate, partials):
+  # the wave does not depend on the note length, so one table per pitch serves
+  # every bpm/bars/meter; the envelope is applied per render in iter_wav
+  global _tone_bytes
+  key = (pitch, rate, partials)
+  wave = _tone_cache.pop(key, None)
+  if wave is None:
+    w = 2 * np.pi * 440.0 * 2 ** ((pitch - 69) / 12.0) * (np.arange(int(round(TONE_SECONDS * rate)), dtype=np.float64) / rate)
+    wave = (sum(a * np.sin(k * w) for k, a in enumerate(partials, 1)) / sum(abs(a) for a in partials)).astype(np.float32)
+    _tone_bytes += wave.nbytes
+    while _tone_cache and _tone_bytes > TONE_CACHE_BYTES:
+      _tone_bytes -= _tone_cache.popitem(last=False)[1].nbytes
+  _tone_cache[key] = wave
+  return wave
+
+def _envelope(n, rate):
+  t = np.arange(n, dtype=np.float64) / rate
+  vol, attack, dur = 0.22, 0.002, n / float(rate)
+  return np.where(t < attack, vol * t / attack,
+                  vol * (0.0005 / vol) ** ((t - attack) / max(dur - attack, 1e-9))).astype(np.float32)
+
+def iter_wav(parsed, bpm=90, bars=1, numer=4, rate=WAV_RATE, partials=(1.0,), chunk_seconds=5.0):
+  # 16-bit mono WAV of `parsed` chords, header first, then about `chunk_seconds`
+  # of PCM per chunk. Chords are mixed from cached per-pitch tones; the last
+  # MIX_CACHE_SIZE mixes are kept, so memory stays bounded however many
+  # distinct chords a render has. Chord starts are rounded from exact times so
+  # long renders do not drift.
+  chord_sec = 60.0 / bpm * numer * bars
+  starts = np.round(np.arange(len(parsed) + 1) * chord_sec * rate).astype(np.int64)
+  total = int(starts[-1])
+  n_tone = int(round(min(chord_sec * 0.95, TONE_SECONDS) * rate))
+  env = _envelope(n_tone, rate)
+  partials = tuple(partials)
+  yield (b"RIFF" + struct.pack("<I", 36 + 2 * total) + b"WAVEfmt " +
+         struct.pack("<IHHIIHH", 16, 1, 1, rate, 2 * rate, 2, 16) + b"data" + struct.pack("<I", 2 * total))
+  mixed = OrderedDict()
+  per_chunk = max(1, int(chunk_seconds / chord_sec))
+  for c0 in range(0, len(parsed), per_chunk):
+    c1 = min(c0 + per_chunk, len(parsed))
+    buf = np.zeros(int(starts[c1] - starts[c0]), np.float32)
+    for c in range(c0, c1):
+      notes = tuple(parsed[c])
+      block = mixed.pop(notes, None)
+      if block is None:
+        block = np.zeros(n_tone, np.float32)
+        for n in notes: block += _tone(n, rate, partials)[:n_tone]
+        block = np.clip(block * env, -1, 1, out=block)
+        if len(mixed) >= MIX_CACHE_SIZE: mixed.popitem(last=False)
+      mixed[notes] = block
+      off = int(starts[c] - starts[c0])
+      buf[off:off + n_tone] = block
+    yield (buf * 32767).astype("<i2").tobytes()
+
+def render_wav(tokens, bpm=90, bars=1, numer=4, rate=WAV_RATE, partials=(1.0,), voicing="block"):
+  # iter_wav for chord tokens; unknown chords and over-long renders raise here,
+  # before the header is produced
+  parsed = compile_progression(tokens)
+  if len(parsed) * 60.0 / bpm * numer * bars > WAV_MAX_SECONDS:
+    raise ValueError("Progression longer than {0} seconds".format(WAV_MAX_SECONDS))
+  if voicing == "smooth": parsed = voice_progression(parsed)
+  gen = iter_wav(parsed, bpm, bars, numer, rate, partials)
+  return chain([next(gen)], gen)
+
 PAGE = """
 <!doctype html>
 <title>Text → Chord MIDI</title>
 <meta name="viewport" content="width=device-width, initial-scale=1">
-<style>
- body{font-family:system-ui,Segoe UI,Arial;padding:24px;background:#f6f7fb;color:#111}
- .card{max-width:920px;margin:0 auto;background:#fff;border-radius:12px;box-shadow:0 8px 30px rgba(0,0,0,.06);padding:20px}
- textarea,input,select{padding:.6rem;border:1px solid #d1d5db;border-radius:10px}
- .row{display:flex;gap:10px;flex-wrap:wrap;align-items:center;margin:.5rem 0}
- button{padding:.6rem 1rem;border:none;border-radius:999px;background:#2563eb;color:#fff;font-weight:700;cursor:pointer}
- button[disabled]{opacity:.6;cursor:not-allowed}
- .small{color:#6b7280;font-size:.9rem;margin-top:6px}
- /* timeline visualization */
- .timeline{position:relative;height:56px;border:2px solid #e5e7eb;border-radius:12px;overflow:hidden;margin-top:10px;background:#f9fafb}
- .tl-track{position:absolute;inset:0;display:flex}
- .tl-chord{flex:1 0 auto;display:flex;align-items:center;justify-content:center;font-weight:700;color:#374151;border-right:2px solid #fff;background:#e5e7eb}
- .tl-chord:last-child{border-right:none}
- .tl-chord.active{background:#3b82f6;color:#fff}
- .playhead{position:absolute;top:0;bottom:0;width:2px;background:#ef4444;box-shadow:0 0 0 1px rgba(239,68,68,.2);transform:translateX(0)}
-</style>
+<link rel="stylesheet" href="{{ asset_url('chord.css') }}">
 <div class="card">
   <h2>Text → Chord MIDI</h2>
   <form method="post">
@@ -152,6 +467,7 @@ PAGE = """
         <input type="number" name="denom" value="4" min="1" max="8" style="width:70px"></label>
       <label>Program <input type="number" name="program" value="0" min="0" max="127" style="width:90px"></label>
       <label>Vel <input type="number" name="vel" value="96" min="1" max="127" style="width:70px"></label>
+      <label>Voicing <select name="voicing"><option value="block">Block</option><option value="smooth">Smooth</option></select></label>
     </div>
     <div class="row">
       <button type="button" id="preview_play">▶ Preview</button>
@@ -165,147 +481,202 @@ PAGE = """
   </form>
 </div>
 
-{% raw %}
-<script>
-(function(){
-  const $ = s => document.querySelector(s);
-  const msg = t => { const el=$('#pv_msg'); if (el) el.textContent=t||''; };
-
-  // Show JS errors on page
-  window.addEventListener('error', e => msg('JS error: ' + (e.error?.message || e.message)));
-
-  // Parser copied from code_pen.html
-  const NOTE_TO_SEMITONE = {C:0,"C#":1,Db:1,D:2,"D#":3,Eb:3,E:4,F:5,"F#":6,Gb:6,G:7,"G#":8,Ab:8,A:9,"A#":10,Bb:10,B:11};
-  const BASE_TRIADS = {"maj":[0,4,7],"":[0,4,7],"m":[0,3,7],"dim":[0,3,6],"aug":[0,4,8],"+":[0,4,8],"sus2":[0,2,7],"sus4":[0,5,7]};
-  const SEVENTHS = {"maj7":11,"m7":10,"7":10};
-  const TENSIONS = {"b9":13,"9":14,"#9":15,"11":17,"#11":18,"b13":20,"13":21};
-  const CHORD_RE = new RegExp("^([A-G](?:#|b)?)(?:(m7b5|ø7|ø|maj7|m7|7|maj|m|dim|aug|[+]|sus2|sus4)?(maj7|m7|7)?)?((?:add9|madd9|maj9|m9|9|11|13|6|m6)?)((?:b9|#9|9|11|#11|b13|13)*)$","i");
-  function splitTensions(s){ const r=[],re=/(b9|#9|9|11|#11|b13|13)/gi; let m; while((m=re.exec(s))) r.push(m[1]); return r; }
-  function sanitizeInput(s){ return s.replace(/♭/g,"b").replace(/♯/g,"#").replace(/ø/g,"ø").replace(/[-–—]/g," ").replace(/\s+/g," ").trim(); }
-  function renderTimeline(tokens){
-    const el=document.getElementById('pv_timeline'); if(!el) return;
-    const track=document.createElement('div'); track.className='tl-track'; track.style.width='100%';
-    tokens.forEach(t=>{ const c=document.createElement('div'); c.className='tl-chord'; c.textContent=t; track.appendChild(c); });
-    const ph=document.createElement('div'); ph.className='playhead';
-    el.innerHTML=''; el.appendChild(track); el.appendChild(ph);
-  }
-  function buildIntervals(baseQual, explicit7th, shorthand, extras){
-    const set=new Set(); const isHalf=/^(m7b5|ø7|ø)$/i.test(baseQual||"");
-    if(isHalf){ [0,3,6,10].forEach(x=>set.add(x)); } else { (BASE_TRIADS[baseQual||""]||BASE_TRIADS[""]).forEach(x=>set.add(x)); }
-    const sh=(shorthand||"").toLowerCase();
-    if(sh==="m6"){ set.clear(); BASE_TRIADS["m"].forEach(x=>set.add(x)); set.add(9); }
-    else if(sh==="6"){ set.add(9); }
-    if(sh==="madd9"){ set.clear(); BASE_TRIADS["m"].forEach(x=>set.add(x)); set.add(14); }
-    else if(sh==="add9"){ set.add(14); }
-    if(sh==="maj9"){ set.clear(); BASE_TRIADS["maj"].forEach(x=>set.add(x)); set.add(11); set.add(14); }
-    if(sh==="m9"){ set.clear(); BASE_TRIADS["m"].forEach(x=>set.add(x)); set.add(10); set.add(14); }
-    if(sh==="9"){ set.add(10); set.add(14); }
-    if(sh==="11"){ set.add(10); set.add(17); }
-    if(sh==="13"){ set.add(10); set.add(21); }
-    if(explicit7th && !isHalf) set.add(SEVENTHS[explicit7th]);
-    extras.forEach(t=>{ const k=t.replace("♭","b").replace("♯","#"); const v=TENSIONS[k]; if(v!=null) set.add(v); });
-    return Array.from(set).sort((a,b)=>a-b);
-  }
-  function chordToNotes(tok){
-    const m=tok.match(CHORD_RE); if(!m) return null;
-    let [,rootRaw,qa="",qb="",sh="",extra=""]=m;
-    let base=(qa||"").toLowerCase(); if(base==="maj") base=""; if(base==="ø") base="ø7";
-    let exp=""; if(qb && /^(maj7|m7|7)$/i.test(qb)) exp=qb.toLowerCase();
-    else if(qa && /^(maj7|m7|7)$/i.test(qa) && !/^(m7b5|ø7|ø)$/i.test(qa)){ exp=qa.toLowerCase(); base=""; }
-    const rootName=rootRaw[0].toUpperCase()+(rootRaw[1]||""); if(!(rootName in NOTE_TO_SEMITONE)) return null;
-    const ints=buildIntervals(base,exp,(sh||"").toLowerCase(),splitTensions(extra));
-    const root=60+NOTE_TO_SEMITONE[rootName]; const notes=ints.map(s=>root+s); notes.unshift(root-12);
-    return notes.map(n=>n>76?n-12:n);
-  }
-  function midiToFreq(m){ return 440*Math.pow(2,(m-69)/12); }
-
-  // Audio
-  const actx = new (window.AudioContext||window.webkitAudioContext)();
-  let playing=false, idx=0, timer=null, parsed=[], chordDur=1;
-
-  function playTone(freq,dur=0.18,vol=0.25){
-    const now=actx.currentTime, osc=actx.createOscillator(), g=actx.createGain();
-    osc.type='sine'; osc.frequency.value=freq;
-    g.gain.setValueAtTime(0,now);
-    g.gain.linearRampToValueAtTime(vol,now+0.002);
-    g.gain.exponentialRampToValueAtTime(0.0005,now+dur);
-    osc.connect(g).connect(actx.destination);
-    osc.start(now); osc.stop(now+dur+0.02);
-  }
-  function playChord(freqs,dur){ freqs.forEach(f=>playTone(f, Math.min(dur*0.95, 2.5), 0.22)); }
-
-  async function onPlay(){
-    try{
-      const text=sanitizeInput(document.querySelector('[name="chords"]').value||"");
-      const tokens=text.split(/\s+/).filter(Boolean);
-      if(!tokens.length){ msg("Enter chords first"); return; }
-      renderTimeline(tokens);
-      parsed=tokens.map(ch=>chordToNotes(ch));
-      if(parsed.some(v=>!v)){ const bad=tokens[parsed.findIndex(v=>!v)]; msg("Unknown chord: "+bad); return; }
-      const bpm=Math.max(30,Math.min(240,+document.querySelector('[name="bpm"]').value||90));
-      const bars=Math.max(1,Math.min(8,+document.querySelector('[name="bars"]').value||1));
-      const numer=Math.max(1,Math.min(12,+document.querySelector('[name="numer"]').value||4));
-      const secPerBeat=60/bpm; chordDur=secPerBeat*numer*bars;
-
-      await actx.resume(); // user gesture required
-      playing=true; idx=0; $('#preview_play').disabled=true; $('#preview_stop').disabled=false; msg("Previewing...");
-      step();
-    }catch(e){ msg("Preview error: " + (e.message||e)); }
-  }
-  function step(){
-    if(!playing) return;
-    const freqs=parsed[idx].map(midiToFreq);
-    playChord(freqs, chordDur);
-    const tl=document.getElementById('pv_timeline');
-    const ph=tl?.querySelector('.playhead');
-    const blocks=tl?Array.from(tl.querySelectorAll('.tl-chord')):[];
-    const total=parsed.length; const tlWidth=tl?.clientWidth||0; const bw=total? tlWidth/total : 0;
-    if(ph && tlWidth>0){
-      const sx=Math.floor(bw*idx), ex=Math.floor(bw*(idx+1));
-      const st=performance.now(); const dur=chordDur*1000;
-      blocks.forEach(b=>b.classList.remove('active')); if(blocks[idx]) blocks[idx].classList.add('active');
-      function anim(){ if(!playing) return; const p=Math.min(1,(performance.now()-st)/dur); const x=sx+(ex-sx)*p; ph.style.transform=`translateX(${x}px)`; if(p<1) requestAnimationFrame(anim); }
-      requestAnimationFrame(anim);
-    }
-    idx++;
-    if(idx<parsed.length) timer=setTimeout(step, chordDur*1000);
-    else onStop(true);
-  }
-  function onStop(done){
-    playing=false; if(timer){ clearTimeout(timer); timer=null; }
-    $('#preview_play').disabled=false; $('#preview_stop').disabled=true; msg(done?"Preview ended":"");
-    const tl=document.getElementById('pv_timeline'); if(tl){ tl.querySelectorAll('.tl-chord').forEach(b=>b.classList.remove('active')); const ph=tl.querySelector('.playhead'); if(ph) ph.style.transform='translateX(0)'; }
-  }
-
-  document.getElementById('preview_play')?.addEventListener('click', onPlay);
-  document.getElementById('preview_stop')?.addEventListener('click', ()=>onStop(false));
-})();
-</script>
-{% endraw %}
+<script src="{{ asset_url('chord.js') }}" defer></script>
 """
 
+# page template compiled once; the plain GET page is rendered once as well
+assets = StaticAssets(app)
+metrics.instrument(app, "chords")
+PAGE_T = app.jinja_env.from_string(PAGE)
+INDEX_HTML = PAGE_T.render(error=None)
+
+def export_options(src):
+  # clamped write_mid settings from form fields or a batch row
+  def num(key, default):
+    v = src.get(key)
+    return int(default if v is None or v == "" else v)
+  denom = num("denom", 4)
+  return dict(bpm=max(30, min(240, num("bpm", 90))),
+              bars=max(1, min(8, num("bars", 1))),
+              numer=max(1, min(12, num("numer", 4))),
+              denom=denom if denom in (1,2,4,8) else 4,
+              program=max(0, min(127, num("program", 0))),
+              velocity=max(1, min(127, num("vel", 96))),
+              voicing="smooth" if src.get("voicing") == "smooth" else "block")
+
+# -- batch export: JSONL or CSV rows in, a ZIP streamed out as workers finish
+
+def _batch_rows(body, fmt):
+  # (line number, row dict or error message)
+  if fmt == "csv":
+    reader = csv.DictReader(io.StringIO(body))
+    for row in reader:
+      yield reader.line_num, row
+    return
+  for n, line in enumerate(body.splitlines(), 1):
+    if not line.strip(): continue
+    try:
+      row = json.loads(line)
+    except ValueError as e:
+      yield n, "Bad JSON: {0}".format(e); continue
+    if isinstance(row, str): row = {"chords": row}
+    yield n, row if isinstance(row, dict) else "Expected a JSON object or string"
+
+def _batch_item(n, row):
+  if not isinstance(row, dict): return row
+  row = dict(row)
+  if row.get("vel") is None: row["vel"] = row.get("velocity")
+  if row.get("meter"): row["numer"], row["denom"] = str(row["meter"]).split("/")
+  chords = row.get("chords") or ""
+  name = re.sub(r"[^\w.-]+", "_", str(row.get("name") or ""))[:64]
+  return ("{0:05d}_{1}.mid" if name else "{0:05d}.mid").format(n, name), chords, export_options(row)
+
+EXPORT_TOKENS = metrics.histogram("midi_export_tokens", "Chord tokens per exported file.", metrics.exponential(1, 4, 10))
+EXPORT_NOTES = metrics.histogram("midi_export_notes", "Notes per exported file.", metrics.exponential(4, 4, 10))
+EXPORT_SECONDS = metrics.histogram("midi_export_seconds", "write_mid time per exported file.",
+                                   metrics.exponential(0.0001, 2, 16))
+
+def _export_bytes(tokens, opts):
+  # (file, tokens, notes, seconds); timed where it runs, recorded by the caller,
+  # since pool workers cannot update this process's metrics
+  t0 = time.perf_counter()
+  data = write_mid(tokens, **opts).getvalue()
+  return data, len(tokens), sum(len(chord_notes(t)) for t in tokens), time.perf_counter() - t0
+
+def _record_export(result):
+  data, ntokens, notes, seconds = result
+  EXPORT_TOKENS.observe(ntokens); EXPORT_NOTES.observe(notes); EXPORT_SECONDS.observe(seconds)
+  return data
+
+def _export_chunk(items):
+  # runs in a worker: [(line, filename, chords, options)] -> [(line, filename, _export_bytes(), error)]
+  out = []
+  for n, fname, chords, opts in items:
+    try:
+      out.append((n, fname, _export_bytes(parse_progression(chords)[0], opts), None))
+    except Exception as e:
+      out.append((n, fname, None, str(e)))
+  return out
+
+_export_pool = None
+
+def _get_export_pool():
+  global _export_pool
+  if app.config["CPU_EXECUTOR"] is not None: return app.config["CPU_EXECUTOR"]
+  if _export_pool is None: _export_pool = ProcessPoolExecutor(EXPORT_WORKERS)
+  return _export_pool
+
+class _ZipSink(object):
+  # write-only file for ZipFile; the response generator drains it after each entry
+  def __init__(self): self.parts = []
+  def write(self, b): self.parts.append(bytes(b)); return len(b)
+  def flush(self): pass
+  def drain(self):
+    data = b"".join(self.parts); self.parts = []
+    return data
+
+def _chunk_error(e):
+  return "Export failed: {0}".format(str(e) or type(e).__name__)
+
+def _stream_zip(chunks, manifest):
+  sink = _ZipSink()
+  with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+    pool = _get_export_pool(); pending = {}; chunks = iter(chunks)
+    inflight = 2 * (EXPORT_WORKERS or os.cpu_count() or 1)
+    while True:
+      for items in chunks:
+        try:
+          pending[pool.submit(_export_chunk, items)] = items
+        except Exception as e:   # e.g. the pool is shutting down
+          manifest.extend({"line": n, "file": None, "error": _chunk_error(e)} for n, _, _, _ in items)
+        if len(pending) >= inflight: break
+      if not pending: break
+      done, _ = wait(pending, return_when=FIRST_COMPLETED)
+      for fut in done:
+        items = pending.pop(fut)
+        try:
+          results = fut.result()
+        except Exception as e:
+          # a broken pool or unpicklable chunk fails the whole chunk; the
+          # headers are already sent, so it is reported in the manifest
+          results = [(n, fname, None, _chunk_error(e)) for n, fname, _, _ in items]
+        for n, fname, res, err in results:
+          data = _record_export(res) if res is not None else None
+          if data is not None: zf.writestr(fname, data)
+          manifest.append({"line": n, "file": fname if data is not None else None, "error": err})
+      yield sink.drain()
+    manifest.sort(key=lambda m: m["line"])
+    zf.writestr("manifest.jsonl", "".join(json.dumps(m) + "\n" for m in manifest))
+  yield sink.drain()
+
+@app.route("/batch", methods=["POST"])
+def batch():
+  # body: one progression per JSONL line ({"chords": "...", "bpm": 120, "meter": "3/4", ...})
+  # or CSV with the same column names; ?format=csv|jsonl overrides the content type
+  fmt = request.args.get("format") or ("csv" if request.mimetype == "text/csv" else "jsonl")
+  manifest, items = [], []
+  for n, row in _batch_rows(request.get_data(as_text=True), fmt):
+    try:
+      item = _batch_item(n, row)
+    except (TypeError, ValueError) as e:
+      item = "Bad options: {0}".format(e)
+    if isinstance(item, tuple): items.append((n,) + item)
+    else: manifest.append({"line": n, "file": None, "error": item})
+    if len(items) + len(manifest) > BATCH_MAX_ITEMS:
+      return jsonify(error="at most {0} progressions per batch".format(BATCH_MAX_ITEMS)), 413
+  chunks = [items[k:k + BATCH_CHUNK] for k in range(0, len(items), BATCH_CHUNK)]
+  return Response(_stream_zip(chunks, manifest), mimetype="application/zip",
+                  headers={"Content-Disposition": "attachment; filename=chords.zip"})
+
+@app.route("/wav", methods=["GET","POST"])
+def wav():
+  # same fields as / (GET query or POST form); streams the progression as WAV
+  try:
+    opts = export_options(request.values)
+    stream = render_wav(parse_progression(request.values.get("chords",""))[0],
+                        opts["bpm"], opts["bars"], opts["numer"], voicing=opts["voicing"])
+  except ValueError as e:
+    return jsonify(error=str(e)), 400
+  return Response(stream, mimetype="audio/wav", headers={"Content-Disposition": "inline; filename=chords.wav"})
+
+# -- export cache: identical progressions + settings share one file, built once
+
+export_cache = ResultCache(EXPORT_CACHE_BYTES)
+
+def export_etag(tokens, opts):
+  # strong validator derived from the normalized request, so 304s need no lookup
+  key = json.dumps([tokens, sorted(opts.items())], separators=(",", ":"))
+  return hashlib.blake2b(key.encode("utf8"), digest_size=16).hexdigest()
+
+@app.route("/api/cache")
+def api_cache():
+  return jsonify(export_cache.stats())
+
 @app.route("/", methods=["GET","POST"])
 def index():
   if request.method == "POST":
-    text = sanitize(request.form.get("chords",""))
-    tokens = [t for t in re.split(r"[\s,]+", text) if t and t != "-"]
+    text = request.form.get("chords","")
     try:
-      bpm   = max(30, min(240, int(request.form.get("bpm", "90") or 90)))
-      bars  = max(1,  min(8,   int(request.form.get("bars","1") or 1)))
-      numer = max(1,  min(12,  int(request.form.get("numer","4") or 4)))
-      denom = int(request.form.get("denom","4") or 4)
-      denom = denom if denom in (1,2,4,8) else 4
-      prog  = max(0,  min(127, int(request.form.get("program","0") or 0)))
-      vel   = max(1,  min(127, int(request.form.get("vel","96") or 96)))
-      bio = write_mid(tokens, bpm=bpm, bars=bars, numer=numer, denom=denom, program=prog, velocity=vel)
       fname = "chords.mid"
-      try:
-        return send_file(bio, as_attachment=True, download_name=fname, mimetype="audio/midi")
-      except TypeError:
-        return send_file(bio, as_attachment=True, attachment_filename=fname, mimetype="audio/midi")
+      if len(text) > STREAM_MIN_TEXT:
+        return Response(stream_mid(text, **export_options(request.form)), mimetype="audio/midi",
+                        headers={"Content-Disposition": "attachment; filename=" + fname})
+      tokens = parse_progression(text)[0]; opts = export_options(request.form)
+      etag = export_etag(tokens, opts)
+      if request.if_none_match.contains(etag):
+        return Response(status=304, headers={"ETag": '"{0}"'.format(etag)})
+      executor = app.config["CPU_EXECUTOR"]
+      if executor is not None:
+        compute = lambda: _record_export(executor.submit(_export_bytes, tokens, opts).result())
+      else:
+        compute = lambda: _record_export(_export_bytes(tokens, opts))
+      data = export_cache.get_or_compute("mid:" + etag, compute)
+      resp = Response(data, mimetype="audio/midi", headers={"Content-Disposition": "attachment; filename=" + fname})
+      resp.set_etag(etag)
+      return resp
     except Exception as e:
-      return render_template_string(PAGE, error=str(e))
-  return render_template_string(PAGE, error=None)
+      return PAGE_T.render(error=str(e))
+  return INDEX_HTML
 
 if __name__ == "__main__":
   app.run(host="127.0.0.1", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,92 @@
+# inspect_corpus.py
+# Batch MIDI inspector: walks a directory tree and writes one JSON record per file.
+# Usage: python inspect_corpus.py CORPUS_DIR [-o out.jsonl] [-j WORKERS]
+import argparse, json, mmap, os, sys, time
+from multiprocessing import Pool
+
+from app import MAX_MIDI_BYTES, scan_midi
+
+MIDI_EXTS = (".mid", ".midi", ".smf", ".kar")
+
+def find_midi_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if fn.lower().endswith(MIDI_EXTS):
+                yield os.path.join(dirpath, fn)
+
+def _merged(tracks, key):
+    # tempo/meter/key events from all tracks, in tick order
+    return sorted((dict(e, track=t["track"]) for t in tracks for e in t[key]), key=lambda e: (e["tick"], e["track"]))
+
+def _channel_totals(tracks):
+    chans = {}
+    for t in tracks:
+        for c in t["channels"]:
+            tot = chans.setdefault(c["channel"], {"channel": c["channel"], "note_on": 0, "note_off": 0,
+                                                  "pitch": None, "velocity": None, "program": None})
+            tot["note_on"] += c["note_on"]; tot["note_off"] += c["note_off"]
+            if c["program"] is not None: tot["program"] = c["program"]
+            for k in ("pitch", "velocity"):
+                if c[k]:
+                    tot[k] = c[k] if tot[k] is None else [min(tot[k][0], c[k][0]), max(tot[k][1], c[k][1])]
+    return [chans[ch] for ch in sorted(chans)]
+
+def inspect_file(path, max_bytes=MAX_MIDI_BYTES):
+    rec = {"path": path, "size": None}
+    try:
+        with open(path, "rb") as fh:
+            rec["size"] = size = os.fstat(fh.fileno()).st_size
+            if size == 0: raise RuntimeError("Empty file")
+            if size > max_bytes: raise RuntimeError(f"MIDI data exceeds {max_bytes} bytes")
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                result = scan_midi(mm)
+        tracks = result["tracks"]
+        rec.update({
+            "header": result["header"],
+            "track_names": [t["name"] for t in tracks],
+            "tempo_map": _merged(tracks, "tempos"),
+            "meter_map": _merged(tracks, "meters"),
+            "key_map": _merged(tracks, "keys"),
+            "channels": _channel_totals(tracks),
+            "error": None,
+        })
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+    return rec
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect every MIDI file under a directory into JSONL.")
+    ap.add_argument("root")
+    ap.add_argument("-o", "--output", help="JSONL output path (default: stdout)")
+    ap.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunksize", type=int, default=16, help="files handed to a worker at a time")
+    args = ap.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf8") if args.output else sys.stdout
+    totals = {"files": 0, "ok": 0, "failed": 0, "bytes": 0, "tracks": 0, "notes": 0}
+    t0 = time.perf_counter()
+    try:
+        with Pool(args.workers) as pool:
+            for rec in pool.imap_unordered(inspect_file, find_midi_files(args.root), args.chunksize):
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                totals["files"] += 1
+                totals["bytes"] += rec["size"] or 0
+                if rec["error"]:
+                    totals["failed"] += 1
+                else:
+                    totals["ok"] += 1
+                    totals["tracks"] += rec["header"]["tracks"]
+                    totals["notes"] += sum(c["note_on"] for c in rec["channels"])
+    finally:
+        if out is not sys.stdout: out.close()
+
+    elapsed = time.perf_counter() - t0
+    totals["seconds"] = round(elapsed, 3)
+    totals["files_per_sec"] = round(totals["files"] / elapsed, 1) if elapsed else None
+    totals["mb_per_sec"] = round(totals["bytes"] / 1e6 / elapsed, 2) if elapsed else None
+    print(json.dumps(totals), file=sys.stderr)
+    return 1 if totals["files"] and not totals["ok"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
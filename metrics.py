@@ -0,0 +1,131 @@
+# metrics.py
+# In-process metrics for the Flask apps: Prometheus-text histograms, per-route
+# latency, and an opt-in sampling profiler for single flagged requests.
+import itertools, os, sys, threading, time
+from bisect import bisect_left
+from collections import Counter
+from flask import Response, g, request
+
+def exponential(start, factor, count):
+    return [start * factor ** k for k in range(count)]
+
+class Histogram:
+    def __init__(self, name, help, buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        self.labelnames = labelnames
+        self._series = {}   # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None: s = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            k = bisect_left(self.buckets, value)
+            if k < len(self.buckets): s[0][k] += 1
+            s[1] += value; s[2] += 1
+
+    def render(self):
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items())
+        for labels, counts, total, n in series:
+            lab = ",".join(f'{k}="{v}"' for k, v in zip(self.labelnames, labels))
+            cum = 0
+            for le, c in zip(self.buckets, counts):
+                cum += c
+                out.append(f'{self.name}_bucket{{{lab + "," if lab else ""}le="{float(le)!r}"}} {cum}')
+            out.append(f'{self.name}_bucket{{{lab + "," if lab else ""}le="+Inf"}} {n}')
+            # repr: exact round-trip, so large sums keep their small increments
+            out.append(f"{self.name}_sum{{{lab}}} {total!r}" if lab else f"{self.name}_sum {total!r}")
+            out.append(f"{self.name}_count{{{lab}}} {n}" if lab else f"{self.name}_count {n}")
+        return "\n".join(out)
+
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+def histogram(name, help, buckets, labelnames=()):
+    # one histogram per name for the whole process, shared by every app that asks
+    with _registry_lock:
+        if name not in REGISTRY: REGISTRY[name] = Histogram(name, help, buckets, labelnames)
+        return REGISTRY[name]
+
+def render():
+    with _registry_lock:
+        hists = [REGISTRY[k] for k in sorted(REGISTRY)]
+    return "\n".join(h.render() for h in hists) + "\n"
+
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "Request latency by app and route.",
+                            exponential(0.001, 2, 16), ("app", "route", "method", "status"))
+
+# -- sampling profiler: collapsed stacks ("a;b;c count") for flamegraph.pl / speedscope
+
+class StackSampler:
+    def __init__(self, thread_id, interval=0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start(); return self
+
+    def stop(self):
+        self._stop.set(); self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack: self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+_profile_seq = itertools.count(1)
+
+def instrument(app, name):
+    # Per-route latency for `app` under label app=`name`, a /metrics endpoint, and
+    # the profiler: with app.config["PROFILE_DIR"] set, a request carrying the
+    # header `X-Profile: 1` is sampled and its profile written to that directory.
+    app.config.setdefault("PROFILE_DIR", None)
+    app.config.setdefault("PROFILE_INTERVAL", 0.001)
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_t0 = time.perf_counter()
+        if app.config["PROFILE_DIR"] and request.headers.get("X-Profile") == "1":
+            g.sampler = StackSampler(threading.get_ident(), app.config["PROFILE_INTERVAL"]).start()
+
+    @app.after_request
+    def _observe(resp):
+        t0 = g.pop("metrics_t0", None)
+        if t0 is not None:
+            # observed when the server closes the response, so streamed bodies
+            # (zip batches, chunked exports) count until their last byte is sent
+            labels = (name, request.url_rule.rule if request.url_rule else "unmatched",
+                      request.method, str(resp.status_code))
+            resp.call_on_close(lambda: REQUEST_SECONDS.observe(time.perf_counter() - t0, *labels))
+        sampler = g.pop("sampler", None)
+        if sampler is not None:
+            sampler.stop()
+            os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+            # pid + a per-process sequence number: unique even within one second on one thread
+            fname = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_profile_seq)}.folded"
+            with open(os.path.join(app.config["PROFILE_DIR"], fname), "w") as fh: fh.write(sampler.collapsed())
+            resp.headers["X-Profile-File"] = fname
+        return resp
+
+    @app.teardown_request
+    def _drop_sampler(exc):
+        # after_request is skipped on unhandled errors; never leave a sampler running
+        sampler = g.pop("sampler", None)
+        if sampler is not None: sampler.stop()
+
+    app.add_url_rule("/metrics", "metrics", lambda: Response(render(), mimetype="text/plain; version=0.0.4"))
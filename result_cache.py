@@ -0,0 +1,152 @@
+# result_cache.py
+# Byte-budgeted LRU cache for computed results, with an optional on-disk tier
+# that survives restarts. Keys are strings, values are bytes.
+import hashlib, os, tempfile, threading
+from collections import OrderedDict
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event(); self.value = None; self.error = None
+
+class ResultCache:
+    def __init__(self, mem_bytes=32 << 20, disk_dir=None, disk_bytes=512 << 20):
+        self.mem_bytes = mem_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.counters = dict.fromkeys(("hits", "misses", "evictions", "disk_hits", "disk_writes", "disk_evictions",
+                                       "coalesced"), 0)
+        self._mem = OrderedDict(); self._mem_used = 0
+        self._inflight = {}
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_used = sum(size for _, size, _ in self._disk_entries())
+
+    def get(self, key):
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.counters["hits"] += 1
+                return data
+        data = self._disk_get(key)
+        with self._lock:
+            if data is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1; self.counters["disk_hits"] += 1
+            self._mem_put(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._mem_put(key, data)
+        self._disk_put(key, data)
+
+    def get_or_compute(self, key, compute):
+        # single-flight: concurrent misses on one key wait for the first caller's result
+        data = self.get(key)
+        if data is not None: return data
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.counters["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return flight.value
+        try:
+            flight.value = data = compute()
+            self.put(key, data)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+        return data
+
+    def stats(self):
+        with self._lock:
+            looked_up = self.counters["hits"] + self.counters["misses"]
+            return dict(self.counters, entries=len(self._mem), mem_used=self._mem_used, mem_bytes=self.mem_bytes,
+                        disk_used=self._disk_used, disk_bytes=self.disk_bytes if self.disk_dir else 0,
+                        hit_rate=round(self.counters["hits"] / looked_up, 4) if looked_up else None)
+
+    def _mem_put(self, key, data):
+        if len(data) > self.mem_bytes: return
+        old = self._mem.pop(key, None)
+        if old is not None: self._mem_used -= len(old)
+        self._mem[key] = data; self._mem_used += len(data)
+        while self._mem_used > self.mem_bytes:
+            _, victim = self._mem.popitem(last=False)
+            self._mem_used -= len(victim)
+            self.counters["evictions"] += 1
+
+    # -- disk tier: one file per key, least recently used (by mtime) evicted first
+
+    def _path(self, key):
+        h = hashlib.sha1(key.encode("utf8")).hexdigest()
+        return os.path.join(self.disk_dir, h[:2], h + ".bin")
+
+    def _disk_get(self, key):
+        if not self.disk_dir: return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh: data = fh.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def _disk_put(self, key, data):
+        if not self.disk_dir or len(data) > self.disk_bytes: return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            prev = os.path.getsize(path)
+        except OSError:
+            prev = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as fh: fh.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try: os.unlink(tmp)
+            except OSError: pass
+            return
+        with self._lock:
+            self.counters["disk_writes"] += 1
+            self._disk_used += len(data) - prev
+            over = self._disk_used > self.disk_bytes
+        if over: self._disk_evict()
+
+    def _disk_entries(self):
+        for sub in os.scandir(self.disk_dir):
+            if not sub.is_dir(): continue
+            for ent in os.scandir(sub.path):
+                if ent.name.endswith(".bin"):
+                    st = ent.stat()
+                    yield ent.path, st.st_size, st.st_mtime
+
+    def _disk_evict(self):
+        # trim to 90% of the budget so eviction scans are not run on every put
+        entries = sorted(self._disk_entries(), key=lambda e: e[2])
+        used = sum(size for _, size, _ in entries)
+        target = self.disk_bytes * 9 // 10
+        evicted = 0
+        for path, size, _ in entries:
+            if used <= target: break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            used -= size; evicted += 1
+        with self._lock:
+            self._disk_used = used
+            self.counters["disk_evictions"] += evicted
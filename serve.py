@@ -0,0 +1,119 @@
+# serve.py
+# Production entry point: the MIDI inspector at / and the chord exporter at /chords
+# from one process. CPU-bound parsing and export run on a bounded process pool that
+# is recycled every --max-tasks jobs, and in-flight requests are capped with a
+# bounded wait queue; requests beyond it get 503 + Retry-After.
+# Usage: python serve.py [--port 8000] [--workers N] [--max-inflight 32] [--max-queue 128]
+#        or mount `build()` in any WSGI server, e.g. waitress-serve --call serve:build
+import argparse, os, signal, threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import ClosingIterator
+
+import app as inspector
+import chord_mid_app as chords
+
+class RecyclingPool:
+    # ProcessPoolExecutor replaced after `max_tasks` submissions. The old pool
+    # finishes the work already queued on it and then exits, so long-lived
+    # workers cannot accumulate memory; a crashed pool is replaced the same way.
+    def __init__(self, workers=None, max_tasks=1000):
+        self.workers = workers
+        self.max_tasks = max_tasks
+        self.recycled = 0
+        self._pool = None; self._tasks = 0
+        self._lock = threading.Lock()
+
+    def _replace(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False); self.recycled += 1
+        self._pool = ProcessPoolExecutor(self.workers); self._tasks = 0
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._pool is None or (self.max_tasks and self._tasks >= self.max_tasks): self._replace()
+            self._tasks += 1
+            try:
+                return self._pool.submit(fn, *args)
+            except BrokenProcessPool:
+                self._replace()
+                return self._pool.submit(fn, *args)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None: self._pool.shutdown(wait=wait)
+            self._pool = None
+
+class Backpressure:
+    # WSGI middleware: at most `max_inflight` requests run at once; up to
+    # `max_queue` more wait up to `queue_timeout` seconds for a slot. A slot is
+    # held until the response body is closed, so streamed downloads count.
+    def __init__(self, app, max_inflight=32, max_queue=128, queue_timeout=10.0):
+        self.app = app
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.counters = {"accepted": 0, "rejected": 0, "waiting": 0}
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+
+    def _busy(self, environ, start_response):
+        with self._lock: self.counters["rejected"] += 1
+        return Response("Server busy, retry shortly\n", 503, {"Retry-After": "1"})(environ, start_response)
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            if self.counters["waiting"] >= self.max_queue:
+                full = True
+            else:
+                full = False; self.counters["waiting"] += 1
+        if full: return self._busy(environ, start_response)
+        got = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.counters["waiting"] -= 1
+            if got: self.counters["accepted"] += 1
+        if not got: return self._busy(environ, start_response)
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._slots.release()
+            raise
+        return ClosingIterator(body, [self._slots.release])
+
+def build(workers=None, max_tasks=1000, max_inflight=32, max_queue=128, queue_timeout=10.0):
+    pool = RecyclingPool(workers, max_tasks)
+    inspector.app.config["CPU_EXECUTOR"] = pool
+    chords.app.config["CPU_EXECUTOR"] = pool
+    # both apps serve the whole static/ folder, so /assets/ URLs resolve from either mount
+    application = Backpressure(DispatcherMiddleware(inspector.app, {"/chords": chords.app}),
+                               max_inflight, max_queue, queue_timeout)
+    application.pool = pool
+    return application
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve the MIDI inspector (/) and chord exporter (/chords).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="CPU worker processes")
+    ap.add_argument("--max-tasks", type=int, default=1000, help="jobs before the worker pool is recycled (0: never)")
+    ap.add_argument("--max-inflight", type=int, default=32, help="requests handled at once")
+    ap.add_argument("--max-queue", type=int, default=128, help="requests waiting for a slot before 503s")
+    ap.add_argument("--queue-timeout", type=float, default=10.0, help="seconds a request may wait for a slot")
+    args = ap.parse_args()
+
+    application = build(args.workers, args.max_tasks, args.max_inflight, args.max_queue, args.queue_timeout)
+    server = make_server(args.host, args.port, application, threaded=True)
+    # SIGTERM/SIGINT: stop accepting, let running requests and pool jobs finish
+    stop = lambda *_: threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, stop); signal.signal(signal.SIGINT, stop)
+    print(f"Serving on http://{args.host}:{args.port}/ (chords at /chords/), {args.workers} workers")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        application.pool.shutdown(wait=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# smf_writer.py
+# Byte-level Standard MIDI File writer for block-chord tracks. Produces the same
+# bytes as building the track from mido messages and calling MidiFile.save.
+from __future__ import print_function, unicode_literals
+import struct
+
+def bpm2tempo(bpm):
+  return int(round(60 * 1e6 / bpm))
+
+def vlq(n):
+  out = bytearray([n & 0x7F]); n >>= 7
+  while n:
+    out.insert(0, 0x80 | (n & 0x7F)); n >>= 7
+  return out
+
+def _meta(mtype, payload):
+  return bytearray([0, 0xFF, mtype]) + vlq(len(payload)) + payload
+
+def _data_byte(name, v):
+  if not 0 <= v <= 127: raise ValueError("{0} must be in range 0..127".format(name))
+  return v
+
+def _track_head(tempo, numer, denom, program, track_name, text):
+  if denom < 1 or denom & (denom - 1): raise ValueError("denominator must be a power of 2")
+  head = bytearray()
+  head += _meta(0x51, struct.pack(">I", tempo)[1:])
+  head += _meta(0x58, bytearray([numer, denom.bit_length() - 1, 24, 8]))
+  head += _meta(0x59, bytearray([0, 0]))                       # C major
+  head += _meta(0x03, track_name.encode("latin1"))
+  if text is not None: head += _meta(0x01, text.encode("latin1"))
+  head += bytearray([0, 0xB0, 7, 100, 0, 0xC0, _data_byte("program", program)])
+  return head
+
+def _chord_blocks(chords, velocity, dt, head=b"", tail=b""):
+  # note blocks are laid out in place in a buffer sized up front:
+  #   on:  00 90 n v  00 n v ...      off: <ticks> 80 n 40  00 n 40 ...
+  out = bytearray(len(head) + sum(6 * len(c) + 1 + len(dt) for c in chords) + len(tail))
+  out[:len(head)] = head; p = len(head)
+  for notes in chords:
+    k = len(notes)
+    if min(notes) < 0 or max(notes) > 127: raise ValueError("note must be in range 0..127")
+    out[p + 1] = 0x90
+    out[p + 2:p + 1 + 3 * k:3] = notes
+    out[p + 3:p + 2 + 3 * k:3] = bytearray([velocity]) * k
+    p += 3 * k + 1
+    out[p:p + len(dt)] = dt; p += len(dt)
+    out[p] = 0x80
+    out[p + 1:p + 3 * k:3] = notes
+    out[p + 2:p + 1 + 3 * k:3] = b"\x40" * k
+    p += 3 * k
+  out[p:] = tail
+  return out
+
+_END_OF_TRACK = b"\x00\xFF\x2F\x00"
+
+def _smf_header(ticks_per_beat, track_size):
+  return b"MThd" + struct.pack(">IHHH", 6, 0, 1, ticks_per_beat) + b"MTrk" + struct.pack(">I", track_size)
+
+def chord_track_smf(chords, chord_ticks, tempo, numer=4, denom=4, program=0, velocity=96,
+                    track_name="Chord Track", text=None, ticks_per_beat=480):
+  # chords: lists of MIDI note numbers, each held for chord_ticks. Event order and
+  # running status match mido: note-ons at delta 0, then note-offs (velocity 64)
+  # with the whole chord length on the first one.
+  head = _track_head(tempo, numer, denom, program, track_name, text)
+  out = _chord_blocks(chords, _data_byte("velocity", velocity), vlq(chord_ticks), head, _END_OF_TRACK)
+  return _smf_header(ticks_per_beat, len(out)) + bytes(out)
+
+def iter_chord_track_smf(chords, chord_ticks, tempo, numer=4, denom=4, program=0, velocity=96,
+                         track_name="Chord Track", text=None, ticks_per_beat=480, batch=4096):
+  # Same bytes as chord_track_smf, produced `batch` chords at a time. `chords` is a
+  # callable returning a fresh iterable of note lists; it is walked twice, first
+  # to size the MTrk chunk since its length precedes the events.
+  head = _track_head(tempo, numer, denom, program, track_name, text)
+  velocity = _data_byte("velocity", velocity); dt = vlq(chord_ticks)
+  size = len(head) + len(_END_OF_TRACK) + sum(6 * len(c) + 1 + len(dt) for c in chords())
+  yield _smf_header(ticks_per_beat, size) + bytes(head)
+  pending = []
+  for notes in chords():
+    pending.append(notes)
+    if len(pending) == batch:
+      yield bytes(_chord_blocks(pending, velocity, dt)); pending = []
+  yield bytes(_chord_blocks(pending, velocity, dt, tail=_END_OF_TRACK))
@@ -0,0 +1,113 @@
+(function(){
+  const $ = s => document.querySelector(s);
+  const msg = t => { const el=$('#pv_msg'); if (el) el.textContent=t||''; };
+
+  // Show JS errors on page
+  window.addEventListener('error', e => msg('JS error: ' + (e.error?.message || e.message)));
+
+  // Parser copied from code_pen.html
+  const NOTE_TO_SEMITONE = {C:0,"C#":1,Db:1,D:2,"D#":3,Eb:3,E:4,F:5,"F#":6,Gb:6,G:7,"G#":8,Ab:8,A:9,"A#":10,Bb:10,B:11};
+  const BASE_TRIADS = {"maj":[0,4,7],"":[0,4,7],"m":[0,3,7],"dim":[0,3,6],"aug":[0,4,8],"+":[0,4,8],"sus2":[0,2,7],"sus4":[0,5,7]};
+  const SEVENTHS = {"maj7":11,"m7":10,"7":10};
+  const TENSIONS = {"b9":13,"9":14,"#9":15,"11":17,"#11":18,"b13":20,"13":21};
+  const CHORD_RE = new RegExp("^([A-G](?:#|b)?)(?:(m7b5|ø7|ø|maj7|m7|7|maj|m|dim|aug|[+]|sus2|sus4)?(maj7|m7|7)?)?((?:add9|madd9|maj9|m9|9|11|13|6|m6)?)((?:b9|#9|9|11|#11|b13|13)*)$","i");
+  function splitTensions(s){ const r=[],re=/(b9|#9|9|11|#11|b13|13)/gi; let m; while((m=re.exec(s))) r.push(m[1]); return r; }
+  function sanitizeInput(s){ return s.replace(/♭/g,"b").replace(/♯/g,"#").replace(/ø/g,"ø").replace(/[-–—]/g," ").replace(/\s+/g," ").trim(); }
+  function renderTimeline(tokens){
+    const el=document.getElementById('pv_timeline'); if(!el) return;
+    const track=document.createElement('div'); track.className='tl-track'; track.style.width='100%';
+    tokens.forEach(t=>{ const c=document.createElement('div'); c.className='tl-chord'; c.textContent=t; track.appendChild(c); });
+    const ph=document.createElement('div'); ph.className='playhead';
+    el.innerHTML=''; el.appendChild(track); el.appendChild(ph);
+  }
+  function buildIntervals(baseQual, explicit7th, shorthand, extras){
+    const set=new Set(); const isHalf=/^(m7b5|ø7|ø)$/i.test(baseQual||"");
+    if(isHalf){ [0,3,6,10].forEach(x=>set.add(x)); } else { (BASE_TRIADS[baseQual||""]||BASE_TRIADS[""]).forEach(x=>set.add(x)); }
+    const sh=(shorthand||"").toLowerCase();
+    if(sh==="m6"){ set.clear(); BASE_TRIADS["m"].forEach(x=>set.add(x)); set.add(9); }
+    else if(sh==="6"){ set.add(9); }
+    if(sh==="madd9"){ set.clear(); BASE_TRIADS["m"].forEach(x=>set.add(x)); set.add(14); }
+    else if(sh==="add9"){ set.add(14); }
+    if(sh==="maj9"){ set.clear(); BASE_TRIADS["maj"].forEach(x=>set.add(x)); set.add(11); set.add(14); }
+    if(sh==="m9"){ set.clear(); BASE_TRIADS["m"].forEach(x=>set.add(x)); set.add(10); set.add(14); }
+    if(sh==="9"){ set.add(10); set.add(14); }
+    if(sh==="11"){ set.add(10); set.add(17); }
+    if(sh==="13"){ set.add(10); set.add(21); }
+    if(explicit7th && !isHalf) set.add(SEVENTHS[explicit7th]);
+    extras.forEach(t=>{ const k=t.replace("♭","b").replace("♯","#"); const v=TENSIONS[k]; if(v!=null) set.add(v); });
+    return Array.from(set).sort((a,b)=>a-b);
+  }
+  function chordToNotes(tok){
+    const m=tok.match(CHORD_RE); if(!m) return null;
+    let [,rootRaw,qa="",qb="",sh="",extra=""]=m;
+    let base=(qa||"").toLowerCase(); if(base==="maj") base=""; if(base==="ø") base="ø7";
+    let exp=""; if(qb && /^(maj7|m7|7)$/i.test(qb)) exp=qb.toLowerCase();
+    else if(qa && /^(maj7|m7|7)$/i.test(qa) && !/^(m7b5|ø7|ø)$/i.test(qa)){ exp=qa.toLowerCase(); base=""; }
+    const rootName=rootRaw[0].toUpperCase()+(rootRaw[1]||""); if(!(rootName in NOTE_TO_SEMITONE)) return null;
+    const ints=buildIntervals(base,exp,(sh||"").toLowerCase(),splitTensions(extra));
+    const root=60+NOTE_TO_SEMITONE[rootName]; const notes=ints.map(s=>root+s); notes.unshift(root-12);
+    return notes.map(n=>n>76?n-12:n);
+  }
+  function midiToFreq(m){ return 440*Math.pow(2,(m-69)/12); }
+
+  // Audio
+  const actx = new (window.AudioContext||window.webkitAudioContext)();
+  let playing=false, idx=0, timer=null, parsed=[], chordDur=1;
+
+  function playTone(freq,dur=0.18,vol=0.25){
+    const now=actx.currentTime, osc=actx.createOscillator(), g=actx.createGain();
+    osc.type='sine'; osc.frequency.value=freq;
+    g.gain.setValueAtTime(0,now);
+    g.gain.linearRampToValueAtTime(vol,now+0.002);
+    g.gain.exponentialRampToValueAtTime(0.0005,now+dur);
+    osc.connect(g).connect(actx.destination);
+    osc.start(now); osc.stop(now+dur+0.02);
+  }
+  function playChord(freqs,dur){ freqs.forEach(f=>playTone(f, Math.min(dur*0.95, 2.5), 0.22)); }
+
+  async function onPlay(){
+    try{
+      const text=sanitizeInput(document.querySelector('[name="chords"]').value||"");
+      const tokens=text.split(/\s+/).filter(Boolean);
+      if(!tokens.length){ msg("Enter chords first"); return; }
+      renderTimeline(tokens);
+      parsed=tokens.map(ch=>chordToNotes(ch));
+      if(parsed.some(v=>!v)){ const bad=tokens[parsed.findIndex(v=>!v)]; msg("Unknown chord: "+bad); return; }
+      const bpm=Math.max(30,Math.min(240,+document.querySelector('[name="bpm"]').value||90));
+      const bars=Math.max(1,Math.min(8,+document.querySelector('[name="bars"]').value||1));
+      const numer=Math.max(1,Math.min(12,+document.querySelector('[name="numer"]').value||4));
+      const secPerBeat=60/bpm; chordDur=secPerBeat*numer*bars;
+
+      await actx.resume(); // user gesture required
+      playing=true; idx=0; $('#preview_play').disabled=true; $('#preview_stop').disabled=false; msg("Previewing...");
+      step();
+    }catch(e){ msg("Preview error: " + (e.message||e)); }
+  }
+  function step(){
+    if(!playing) return;
+    const freqs=parsed[idx].map(midiToFreq);
+    playChord(freqs, chordDur);
+    const tl=document.getElementById('pv_timeline');
+    const ph=tl?.querySelector('.playhead');
+    const blocks=tl?Array.from(tl.querySelectorAll('.tl-chord')):[];
+    const total=parsed.length; const tlWidth=tl?.clientWidth||0; const bw=total? tlWidth/total : 0;
+    if(ph && tlWidth>0){
+      const sx=Math.floor(bw*idx), ex=Math.floor(bw*(idx+1));
+      const st=performance.now(); const dur=chordDur*1000;
+      blocks.forEach(b=>b.classList.remove('active')); if(blocks[idx]) blocks[idx].classList.add('active');
+      function anim(){ if(!playing) return; const p=Math.min(1,(performance.now()-st)/dur); const x=sx+(ex-sx)*p; ph.style.transform=`translateX(${x}px)`; if(p<1) requestAnimationFrame(anim); }
+      requestAnimationFrame(anim);
+    }
+    idx++;
+    if(idx<parsed.length) timer=setTimeout(step, chordDur*1000);
+    else onStop(true);
+  }
+  function onStop(done){
+    playing=false; if(timer){ clearTimeout(timer); timer=null; }
+    $('#preview_play').disabled=false; $('#preview_stop').disabled=true; msg(done?"Preview ended":"");
+    const tl=document.getElementById('pv_timeline'); if(tl){ tl.querySelectorAll('.tl-chord').forEach(b=>b.classList.remove('active')); const ph=tl.querySelector('.playhead'); if(ph) ph.style.transform='translateX(0)'; }
+  }
+
+  document.getElementById('preview_play')?.addEventListener('click', onPlay);
+  document.getElementById('preview_stop')?.addEventListener('click', ()=>onStop(false));
+})();
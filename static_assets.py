@@ -0,0 +1,47 @@
+# static_assets.py
+# Versioned static files for the Flask apps: content-hashed URLs, far-future
+# cache headers, and gzip/brotli variants compressed once at startup.
+import gzip, hashlib, mimetypes, os
+from flask import Response, abort, request
+
+try:
+    import brotli
+except ImportError:  # optional: brotli variants are skipped without it
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class StaticAssets:
+    def __init__(self, app, folder=STATIC_DIR, url_prefix="/assets"):
+        self.urls = {}
+        self._files = {}
+        for name in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, name), "rb") as fh: data = fh.read()
+            digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+            stem, ext = os.path.splitext(name)
+            versioned = "%s.%s%s" % (stem, digest, ext)
+            variants = {"gzip": gzip.compress(data, 9, mtime=0)}
+            if brotli: variants["br"] = brotli.compress(data, quality=11)
+            # only keep encodings that actually save bytes
+            variants = dict((enc, v) for enc, v in variants.items() if len(v) < len(data))
+            variants[None] = data
+            self._files[versioned] = (mimetypes.guess_type(name)[0] or "application/octet-stream", digest, variants)
+            self.urls[name] = url_prefix + "/" + versioned
+        app.add_url_rule(url_prefix + "/<name>", "asset", self.serve)
+        app.jinja_env.globals["asset_url"] = self.url
+
+    def url(self, name):
+        return self.urls[name]
+
+    def serve(self, name):
+        entry = self._files.get(name)
+        if entry is None: abort(404)
+        mimetype, digest, variants = entry
+        enc = next((e for e in ("br", "gzip") if e in variants and request.accept_encodings[e]), None)
+        etag = digest if enc is None else digest + "-" + enc
+        headers = {"Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding", "ETag": '"%s"' % etag}
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        if enc: headers["Content-Encoding"] = enc
+        return Response(variants[enc], mimetype=mimetype, headers=headers)
@@ -0,0 +1,38 @@
+# test_chords.py
+import os, random, re, sys
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, ".."), os.path.join(HERE, "..", "benchmarks")]
+import chord_mid_app as cm
+from bench_tokenizer import SEPARATORS, fuzz_tokens, mutate
+from corpus import chord_tokens, random_token
+from smf_writer import bpm2tempo, chord_track_smf, iter_chord_track_smf
+
+def test_parse_chord_matches_regex_reference():
+    for tok in fuzz_tokens(20_000, seed=1):
+        want = cm._compile_token(tok)
+        assert cm.parse_chord(tok) == want, tok
+        assert cm.chord_token_to_midi_notes(tok) == (list(want) if want else None), tok
+
+def test_split_progression_matches_sanitize_split():
+    r = random.Random(2)
+    for _ in range(2_000):
+        text = "".join(r.choice(SEPARATORS) + mutate(r, random_token(r)) for _ in range(r.randrange(1, 12)))
+        want = [t for t in re.split(r"[\s,]+", cm.sanitize(text)) if t and t != "-"]
+        assert cm.split_progression(text) == want, text
+
+@pytest.mark.skipif(cm.MidiFile is None, reason="mido is not installed")
+def test_byte_writers_match_mido():
+    r = random.Random(3)
+    for k in range(300):
+        tokens = chord_tokens(r.randrange(1, 40), seed=k, valid_only=True)
+        bpm, bars, numer, denom = r.randrange(30, 241), r.randrange(1, 9), r.randrange(1, 13), r.choice((1, 2, 4, 8))
+        program, velocity = r.randrange(128), r.randrange(1, 128)
+        parsed = cm.compile_progression(tokens)
+        want = cm._write_mid_mido(parsed, tokens, bpm, bars, numer, denom, program, velocity, "Chord Track").getvalue()
+        args = (480 * numer * bars, bpm2tempo(bpm), numer, denom, program, velocity, "Chord Track", " ".join(tokens)[:120])
+        assert chord_track_smf(parsed, *args) == want, tokens
+        assert b"".join(iter_chord_track_smf(lambda: parsed, *args, batch=7)) == want, tokens
+        assert cm.write_mid(tokens, bpm, bars, numer, denom, program, velocity).getvalue() == want, tokens
+        assert b"".join(cm.stream_mid(" ".join(tokens), bpm, bars, numer, denom, program, velocity)) == want, tokens
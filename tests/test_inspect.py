@@ -0,0 +1,182 @@
+# test_inspect.py
+import io, os, struct, sys, tracemalloc
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import app
+
+def smf(*tracks, ppq=96):
+    hdr = b"MThd" + struct.pack(">IHHH", 6, 0 if len(tracks) == 1 else 1, len(tracks), ppq)
+    return hdr + b"".join(b"MTrk" + struct.pack(">I", len(t)) + bytes(t) for t in tracks)
+
+def channels(result):
+    return {c["channel"]: c for c in result["tracks"][0]["channels"]}
+
+def test_data_bytes_with_high_bit_stay_on_their_channel():
+    # note-on/off with pitch 0xC8 on channel 16 and on channel 1
+    for status in (0x9F, 0x90):
+        data = smf([0, status, 0xC8, 0x40, 0x10, status - 0x10, 0xC8, 0x40, 0, 0xFF, 0x2F, 0])
+        ch = (status & 0x0F) + 1
+        for result in (app.scan_midi(data), app.scan_midi_stream(io.BytesIO(data), window=16)):
+            chans = channels(result)
+            assert list(chans) == [ch]
+            assert chans[ch]["pitch"] == [0x48, 0x48] and chans[ch]["note_on"] == 1 and chans[ch]["note_off"] == 1
+            assert chans[ch]["notes"]["paired"] == 1 and chans[ch]["notes"]["hanging"] == 0
+        assert f"Channel {ch}: notes on/off 1/1  pitch C5-C5" in app.inspect_midi_bytes(data)
+
+def test_time_range_bounds():
+    # at 96 PPQ and 428571 us/quarter these ticks do not survive a round trip through seconds exactly
+    ticks = [117, 225, 234]
+    trk = bytearray(b"\x00\xFF\x51\x03" + (428571).to_bytes(3, "big"))
+    for prev, tick in zip([0] + ticks, ticks): trk += bytes([tick - prev]) + b"\x90\x3C\x40"
+    data = smf(trk + b"\x00\xFF\x2F\x00")
+    tmap = app.TempoMap(96, [(0, 428571)])
+    for tick in ticks:
+        assert app.query_time_range(data, tmap.tick_to_seconds(tick), None)["tracks"][0]["events"][0]["tick"] == tick
+    res = app.query_time_range(data, 0, None, limit=5)
+    assert res["end"] is None and res["tracks"][0]["tick_range"] == [0, None]
+    assert not res["tracks"][0]["truncated"]   # tempo, 3 notes, end of track
+    assert app.query_time_range(data, 0, None, limit=4)["tracks"][0]["truncated"]
+
+def test_time_range_light_timeline_matches_scan():
+    # two tracks long enough for several checkpoints, tempo changes in the first
+    conductor = bytearray()
+    for k in range(40): conductor += b"\x60\xFF\x51\x03" + (400000 + 5000 * k).to_bytes(3, "big")
+    notes = bytearray()
+    for k in range(60000): notes += bytes([k % 7, 0x90 | k % 3, 40 + k % 40, 1 + k % 100])
+    data = smf(conductor + b"\x00\xFF\x2F\x00", notes + b"\x00\xFF\x2F\x00")
+    for entry in app.index_tracks(data)["tracks"]:
+        light, full = app.track_timeline(data, entry), app.scan_track(data, entry)
+        assert light["checkpoints"] == full["checkpoints"]
+        assert light["tempos"] == [{"tick": e["tick"], "mpqn": e["mpqn"]} for e in full["tempos"]]
+    for start, end in ((0, 1), (3.5, 4.25), (20, None)):
+        assert (app.query_time_range(data, start, end, limit=500) ==
+                app.query_time_range(data, start, end, summary=lambda e: app.scan_track(data, e), limit=500))
+
+def test_stream_skips_unread_payloads():
+    notes = bytearray()
+    for k in range(3000): notes += bytes([k % 5, 0x90 | k % 3, 40 + k % 40, k % 100])
+    payloads = (b"\xF0" + vlq(20001) + b"\x11" * 20000 + b"\xF7",    # sysex
+                b"\xFF\x7F" + vlq(30000) + b"\x22" * 30000,          # sequencer-specific meta
+                b"\xFF\x01" + vlq(5000) + b"a" * 5000)               # text: decoded, so buffered
+    trk = notes + b"".join(b"\x05" + p + notes for p in payloads) + b"\x00\xFF\x2F\x00"
+    data = smf(trk)
+    for window in (64, 1000):
+        assert app.scan_midi_stream(io.BytesIO(data), window=window) == app.scan_midi(data)
+    # a 4 MB sysex is read past a window at a time, never held whole
+    big = 4 << 20
+    data = smf(b"\x00\x90\x40\x40\x00\xF0" + vlq(big) + bytes(big - 1) + b"\xF7\x10\x80\x40\x40\x00\xFF\x2F\x00")
+    tracemalloc.start()
+    try:
+        result = app.scan_midi_stream(io.BytesIO(data), window=4096)
+        assert tracemalloc.get_traced_memory()[1] < big // 4
+    finally:
+        tracemalloc.stop()
+    assert channels(result)[1]["notes"]["paired"] == 1
+    with pytest.raises(RuntimeError, match="Truncated"):
+        app.scan_midi_stream(io.BytesIO(data[:-100]), window=4096)
+
+class _BrokenPool:
+    def submit(self, fn, *args):
+        f = Future(); f.set_exception(BrokenProcessPool("pool terminated abruptly")); return f
+
+class _InlinePool:
+    def submit(self, fn, *args):
+        f = Future(); f.set_result(fn(*args)); return f
+
+def test_executor_failures_are_not_cached(monkeypatch):
+    data = smf(b"\x00\x90\x3C\x40\x60\x80\x3C\x40\x00\xFF\x2F\x00")
+    client = app.app.test_client()
+    def post():
+        return client.post("/", data={"mid": (io.BytesIO(data), "a.mid")}).get_data(as_text=True)
+    monkeypatch.setitem(app.app.config, "CPU_EXECUTOR", _BrokenPool())
+    assert "abruptly" in post()
+    monkeypatch.setitem(app.app.config, "CPU_EXECUTOR", _InlinePool())
+    page = post()
+    assert "abruptly" not in page and "Channel 1: notes on/off 1/1" in page
+
+def fold_reference(events, end):
+    # per-event pairing of (tick, channel, pitch, is_on) in file order: a note-on
+    # closes any open note of the same pitch (retrigger), an off with nothing open is unmatched
+    stats, open_notes, deltas = {}, {}, {}
+    for tick, ch, pitch, on in events:
+        st = stats.setdefault(ch, {"hist": [0] * 32, "paired": 0, "unmatched_off": 0})
+        if (ch, pitch) in open_notes:
+            d = tick - open_notes.pop((ch, pitch))
+            st["hist"][min(d.bit_length(), 31)] += 1; st["paired"] += 1
+            deltas.setdefault(tick, {}).setdefault(ch, 0)
+            deltas[tick][ch] -= 1
+        elif not on:
+            st["unmatched_off"] += 1
+        if on:
+            open_notes[ch, pitch] = tick
+            deltas.setdefault(tick, {}).setdefault(ch, 0)
+            deltas[tick][ch] += 1
+    level, since, area, sounding, peak = {}, {}, {}, {}, {}
+    for tick in sorted(deltas):
+        for ch, dv in deltas[tick].items():
+            if not dv: continue
+            span = tick - since.get(ch, 0)
+            area[ch] = area.get(ch, 0) + level.get(ch, 0) * span
+            sounding[ch] = sounding.get(ch, 0) + (span if level.get(ch, 0) else 0)
+            level[ch] = level.get(ch, 0) + dv; since[ch] = tick
+            peak[ch] = max(peak.get(ch, 0), level[ch])
+    for ch, n in level.items():
+        if n:
+            area[ch] += n * (end - since[ch]); sounding[ch] = sounding.get(ch, 0) + end - since[ch]
+    for ch, st in stats.items():
+        while st["hist"] and not st["hist"][-1]: st["hist"].pop()
+        st["hanging"] = sum(1 for c, _ in open_notes if c == ch)
+        st["max_polyphony"] = peak.get(ch, 0)
+        st["avg_polyphony"] = area[ch] / sounding[ch] if sounding.get(ch) else None
+    return stats
+
+def vlq(n):
+    out = [n & 0x7F]
+    while n > 0x7F:
+        n >>= 7; out.append(0x80 | (n & 0x7F))
+    return bytes(reversed(out))
+
+def check_fold(events):
+    # events: (delta, channel, pitch, kind) with kind "on", "off" (0x80) or "on0" (velocity 0)
+    trk, ref_events, tick = bytearray(), [], 0
+    for delta, ch, pitch, kind in events:
+        tick += delta
+        status, vel = (0x80, 0x40) if kind == "off" else (0x90, 0 if kind == "on0" else 0x40)
+        trk += vlq(delta) + bytes([status | ch, pitch, vel])
+        ref_events.append((tick, ch, pitch, kind == "on"))
+    data = smf(trk + b"\x00\xFF\x2F\x00")
+    want = fold_reference(ref_events, tick)
+    for result in (app.scan_midi(data), app.scan_midi_stream(io.BytesIO(data), window=16)):
+        got = {c["channel"] - 1: c["notes"] for c in result["tracks"][0]["channels"]}
+        assert sorted(got) == sorted(want)
+        for ch, st in want.items():
+            n = got[ch]
+            assert n["duration_hist"] == st["hist"] and n["paired"] == st["paired"]
+            assert n["unmatched_off"] == st["unmatched_off"] and n["hanging"] == st["hanging"]
+            assert n["max_polyphony"] == st["max_polyphony"]
+            if st["avg_polyphony"] is None: assert n["avg_polyphony"] is None
+            else: assert abs(n["avg_polyphony"] - st["avg_polyphony"]) < 1e-9
+
+# 0: every batch takes the vectorised fold; 1 << 30: every batch is folded per event
+FOLD_PATHS = pytest.mark.parametrize("scalar_below", [0, 1 << 30])
+
+@FOLD_PATHS
+def test_fold_notes_edge_cases(monkeypatch, scalar_below):
+    monkeypatch.setattr(app, "SCALAR_FOLD_EVENTS", scalar_below)
+    check_fold([(0, 0, 60, "on"), (10, 0, 60, "on"), (10, 0, 60, "off")])            # retrigger
+    check_fold([(0, 0, 60, "off"), (5, 0, 60, "on0"), (5, 0, 60, "on"), (5, 0, 60, "off")])  # unmatched offs
+    check_fold([(0, 0, 60, "on"), (0, 0, 64, "on"), (20, 0, 60, "off")])             # hanging note
+    check_fold([(0, 1, 60, "on"), (0, 1, 60, "off"), (7, 1, 62, "on"), (9, 1, 62, "on0"), (0, 1, 62, "on")])  # same tick
+    check_fold([(0, 2, 60, "on"), (0, 2, 60, "on"), (0, 2, 60, "on0"), (0, 2, 60, "off")])
+
+@FOLD_PATHS
+def test_fold_notes_matches_reference(monkeypatch, scalar_below):
+    monkeypatch.setattr(app, "SCALAR_FOLD_EVENTS", scalar_below)
+    import random
+    r = random.Random(3)
+    for _ in range(20):
+        check_fold([(r.choice((0, 0, 0, 1, 5, 100)), r.randrange(3), r.randrange(60, 64),
+                     r.choice(("on", "on", "off", "on0"))) for _ in range(r.randint(10, 600))])
@@ -1,40 +1,52 @@
-  # to_mid.py
-  # Usage: py -3 to_mid.py
-  from mido import Message, MidiFile, MidiTrack, MetaMessage, bpm2tempo
-
-  def write_mid(outfile='output.mid', bpm=90, numer=4, denom=4):
-      mid = MidiFile(type=0)  # single track
-      mid.ticks_per_beat = 480
-      track = MidiTrack(); mid.tracks.append(track)
-
-      track.append(MetaMessage('set_tempo', tempo=bpm2tempo(bpm), time=0))
-      track.append(MetaMessage('time_signature', numerator=numer, denominator=denom, clocks_per_click=24, notated_32nd_notes_per_beat=8, time=0))
-      track.append(MetaMessage('key_signature', key='C', time=0))
-      track.append(MetaMessage('track_name', name='Chord Track', time=0))
-
-      # Example: three chords, 1 bar each at numer beats per bar
-      chords = [
-          [50, 57, 62, 65, 69],   # Dm7
-          [55, 59, 62, 67, 71],   # G7
-          [48, 55, 59, 64, 71],   # Cmaj7
-      ]
-      chord_ticks = mid.ticks_per_beat * numer
-
-      # Optional channel setup
-      track.append(Message('control_change', channel=0, control=7, value=100, time=0))  # volume
-      track.append(Message('program_change', channel=0, program=0, time=0))            # Acoustic Grand
-
-      for chord in chords:
-          for n in chord:
-              track.append(Message('note_on', note=n, velocity=96, time=0))
-          first = True
-          for n in chord:
-              track.append(Message('note_off', note=n, velocity=64, time=chord_ticks if first else 0))
-              first = False
-
-      track.append(MetaMessage('end_of_track', time=0))
-      mid.save(outfile)
-      print(f"Saved {outfile}")
-
-  if __name__ == '__main__':
-      write_mid('chords.mid', bpm=90, numer=4, denom=4)
\ No newline at end of file
+# to_mid.py
+# Usage: py -3 to_mid.py
+from smf_writer import bpm2tempo, chord_track_smf
+try:
+    from mido import Message, MidiFile, MidiTrack, MetaMessage
+except ImportError:  # optional: only used when USE_MIDO_WRITER is set
+    MidiFile = None
+
+USE_MIDO_WRITER = False   # build the file through mido objects instead of smf_writer
+
+def write_mid(outfile='output.mid', bpm=90, numer=4, denom=4):
+    # Example: three chords, 1 bar each at numer beats per bar
+    chords = [
+        [50, 57, 62, 65, 69],   # Dm7
+        [55, 59, 62, 67, 71],   # G7
+        [48, 55, 59, 64, 71],   # Cmaj7
+    ]
+    chord_ticks = 480 * numer
+
+    # single track: volume 100, Acoustic Grand, velocity 96
+    if USE_MIDO_WRITER and MidiFile is not None:
+        _write_mid_mido(outfile, chords, chord_ticks, bpm, numer, denom)
+    else:
+        data = chord_track_smf(chords, chord_ticks, bpm2tempo(bpm), numer, denom, program=0, velocity=96)
+        with open(outfile, 'wb') as fh:
+            fh.write(data)
+    print(f"Saved {outfile}")
+
+def _write_mid_mido(outfile, chords, chord_ticks, bpm, numer, denom):
+    mid = MidiFile(type=0, ticks_per_beat=480)
+    track = MidiTrack(); mid.tracks.append(track)
+
+    track.append(MetaMessage('set_tempo', tempo=bpm2tempo(bpm), time=0))
+    track.append(MetaMessage('time_signature', numerator=numer, denominator=denom, clocks_per_click=24, notated_32nd_notes_per_beat=8, time=0))
+    track.append(MetaMessage('key_signature', key='C', time=0))
+    track.append(MetaMessage('track_name', name='Chord Track', time=0))
+    track.append(Message('control_change', channel=0, control=7, value=100, time=0))
+    track.append(Message('program_change', channel=0, program=0, time=0))
+
+    for chord in chords:
+        for n in chord:
+            track.append(Message('note_on', note=n, velocity=96, time=0))
+        first = True
+        for n in chord:
+            track.append(Message('note_off', note=n, velocity=64, time=chord_ticks if first else 0))
+            first = False
+
+    track.append(MetaMessage('end_of_track', time=0))
+    mid.save(outfile)
+
+if __name__ == '__main__':
+    write_mid('chords.mid', bpm=90, numer=4, denom=4)